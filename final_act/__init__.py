@@ -1,6 +1,11 @@
+import os
 from flask import Flask
 from flask_mysqldb import MySQL
 from flask_mail import Mail
+# Top-level imports, like db_config and the blueprints, so there is one
+# profiling/metrics module instance
+from profiling import init_profiling
+from metrics import init_metrics, final_act_metrics
 
 mysql = MySQL()
 mail = Mail()
@@ -26,6 +31,26 @@ def create_app():
     mysql.init_app(app)
     mail.init_app(app)
 
+    # --- Request Profiling (opt-in) ---
+    # PROFILE_REQUESTS=1 adds a Server-Timing header (db, hash, render, total).
+    # PROFILE_SAMPLE_RATE of requests also run under cProfile; the ones slower
+    # than PROFILE_SLOW_MS are saved to PROFILE_DIR as .pstats files.
+    app.config['PROFILE_REQUESTS'] = os.environ.get('PROFILE_REQUESTS', '0') == '1'
+    app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+    app.config['PROFILE_SLOW_MS'] = float(os.environ.get('PROFILE_SLOW_MS', '500'))
+    app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', os.path.join(app.root_path, 'profiles'))
+    if app.config['PROFILE_REQUESTS']:
+        init_profiling(app, sample_rate=app.config['PROFILE_SAMPLE_RATE'],
+                       slow_ms=app.config['PROFILE_SLOW_MS'],
+                       profile_dir=app.config['PROFILE_DIR'])
+
+    # --- Metrics (opt-in) ---
+    # METRICS=1 serves Prometheus text format at /metrics. The endpoint has no
+    # authentication, so only expose it where the scraper alone can reach it.
+    app.config['METRICS'] = os.environ.get('METRICS', '0') == '1'
+    if app.config['METRICS']:
+        init_metrics(app, final_act_metrics())
+
     # --- Blueprints ---
     from .blueprints.auth import auth_bp
     from .blueprints.admin import admin_bp
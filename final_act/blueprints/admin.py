@@ -1,5 +1,6 @@
 from flask import Blueprint, render_template, session, redirect, url_for, flash
 from final_act import mysql
+from profiling import TimedCursor
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -10,7 +11,7 @@ def check_admin():
 
 @admin_bp.route('/dashboard')
 def dashboard():
-    cursor = mysql.connection.cursor()
+    cursor = TimedCursor(mysql.connection.cursor())
     
     # 1. User Management
     cursor.execute("SELECT * FROM users WHERE role='user'")
@@ -50,7 +51,7 @@ def dashboard():
 @admin_bp.route('/toggle_status/<int:id>/<string:action>')
 def toggle_status(id, action):
     status = 'inactive' if action == 'block' else 'active'
-    cursor = mysql.connection.cursor()
+    cursor = TimedCursor(mysql.connection.cursor())
     cursor.execute("UPDATE users SET status=%s WHERE id=%s", (status, id))
     
     # Log it
@@ -63,7 +64,7 @@ def toggle_status(id, action):
 
 @admin_bp.route('/toggle_game/<int:uid>/<string:game>/<int:state>')
 def toggle_game(uid, game, state):
-    cursor = mysql.connection.cursor()
+    cursor = TimedCursor(mysql.connection.cursor())
     cursor.execute("UPDATE game_access SET is_enabled=%s WHERE user_id=%s AND game_name=%s", 
                    (state, uid, game))
     mysql.connection.commit()
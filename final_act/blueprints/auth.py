@@ -10,6 +10,7 @@ from datetime import datetime, date, timedelta
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from db_config import get_db_connection
+from profiling import timed
 
 auth_bp = Blueprint('auth_bp', __name__)
 
@@ -246,7 +247,9 @@ def login():
             else:
                 db_password_bytes = db_password
 
-            if bcrypt.checkpw(password.encode('utf-8'), db_password_bytes):
+            with timed("hash"):
+                password_ok = bcrypt.checkpw(password.encode('utf-8'), db_password_bytes)
+            if password_ok:
                 if user.get('status') == 'blocked':
                     flash("Account is blocked.", "error")
                     return redirect(url_for('auth_bp.login'))
@@ -321,7 +324,8 @@ def register():
                     errors['email'] = "Email is already registered."
 
                 if not errors:
-                    hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+                    with timed("hash"):
+                        hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
                     default_role = 'user'
                     
                     # --- HANDLE PROFILE PIC ---
@@ -433,7 +437,8 @@ def reset_password_final():
     if not session.get('reset_verified'): return redirect(url_for('auth_bp.forgot_password'))
     if request.method == 'POST':
         if request.form.get('password') == request.form.get('confirm_password'):
-            hashed = bcrypt.hashpw(request.form.get('password').encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+            with timed("hash"):
+                hashed = bcrypt.hashpw(request.form.get('password').encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
             conn = get_db_connection()
             cursor = conn.cursor()
             cursor.execute("UPDATE users SET password=%s WHERE email=%s", (hashed, session['reset_email']))
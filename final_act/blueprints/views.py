@@ -1,5 +1,6 @@
 from flask import Blueprint, render_template, session, redirect, url_for, request, flash
 from db_config import get_db_connection
+from profiling import timed
 import datetime
 import subprocess
 import sys
@@ -383,7 +384,8 @@ def admin_add_user():
             return render_template('admin_add_user.html', access=session.get('role'))
         
         # If no errors, proceed with user creation
-        hashed_password = generate_password_hash(password)
+        with timed("hash"):
+            hashed_password = generate_password_hash(password)
         
         try:
             cursor.execute("""
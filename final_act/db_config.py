@@ -1,9 +1,26 @@
+import threading
 import mysql.connector
+from profiling import TimedConnection, timed
+
+# Connections opened/closed by get_db_connection, for /metrics
+connection_stats = {"opened": 0, "closed": 0}
+_stats_lock = threading.Lock()
+
+class CountedConnection(TimedConnection):
+    def close(self):
+        with _stats_lock:
+            connection_stats["closed"] += 1
+        return self._conn.close()
 
 def get_db_connection():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",      # Default XAMPP user
-        password="",      # Default XAMPP password
-        database="flask_game_system"
-    )
\ No newline at end of file
+    # Wrapped so queries show up as "db" in Server-Timing when profiling is on
+    with timed("db"):
+        conn = CountedConnection(mysql.connector.connect(
+            host="localhost",
+            user="root",      # Default XAMPP user
+            password="",      # Default XAMPP password
+            database="flask_game_system"
+        ))
+    with _stats_lock:
+        connection_stats["opened"] += 1
+    return conn
\ No newline at end of file
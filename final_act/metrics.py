@@ -0,0 +1,19 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from instrumentation.metrics import RequestMetrics, init_metrics
+
+
+# --- final_act gauges ---
+
+def final_act_metrics():
+    """RequestMetrics plus the MySQL connection counts from db_config."""
+    import db_config
+
+    metrics = RequestMetrics("final_act")
+    stats = db_config.connection_stats
+    metrics.gauge("db_connections_opened_total", "MySQL connections opened by get_db_connection.",
+                  lambda: stats["opened"], kind="counter")
+    metrics.gauge("db_connections_open", "MySQL connections from get_db_connection not closed yet.",
+                  lambda: stats["opened"] - stats["closed"])
+    return metrics
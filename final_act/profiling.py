@@ -0,0 +1,45 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from instrumentation.profiling import init_profiling, timed
+
+
+# --- Timed MySQL connections ---
+
+class TimedCursor:
+    """Cursor wrapper that counts execute/fetch calls as the "db" stage."""
+
+    TIMED = ("execute", "executemany", "callproc", "fetchone", "fetchmany", "fetchall")
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+        if name not in self.TIMED:
+            return attr
+
+        def call(*args, **kwargs):
+            with timed("db"):
+                return attr(*args, **kwargs)
+        return call
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+class TimedConnection:
+    """Connection wrapper whose cursors and commits are timed."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return TimedCursor(self._conn.cursor(*args, **kwargs))
+
+    def commit(self):
+        with timed("db"):
+            return self._conn.commit()
@@ -0,0 +1 @@
+"""Request timing (profiling) and Prometheus metrics shared by the notepad and final_act apps."""
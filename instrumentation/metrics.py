@@ -0,0 +1,159 @@
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, request
+
+# Upper bounds (seconds) of the request latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Shard:
+    """One thread's counters. Only its own thread writes to it."""
+
+    def __init__(self, buckets):
+        self.thread = threading.current_thread()
+        self.requests = {}     # (endpoint, method, status) -> count
+        self.latency = {}      # endpoint -> [count per bucket..., count above the last]
+        self.latency_sum = {}  # endpoint -> seconds
+        self.in_flight = 0
+        self.size = len(buckets) + 1
+
+
+class RequestMetrics:
+    """Request counts, per-endpoint latency histograms and in-flight requests.
+
+    Every thread records into its own shard, so the request path never takes
+    a lock; render() adds the shards up when /metrics is scraped. Shards of
+    threads that have exited are folded into one retired shard then, which
+    keeps memory bounded under thread-per-request servers.
+    """
+
+    def __init__(self, namespace, buckets=BUCKETS):
+        self.namespace = namespace
+        self.buckets = buckets
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()   # only taken for a thread's first request and by render()
+        self._retired = _Shard(buckets)
+        self._gauges = []
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard(self.buckets)
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def started(self):
+        self._shard().in_flight += 1
+
+    def finished(self, endpoint, method, status, seconds):
+        shard = self._shard()
+        shard.in_flight -= 1
+        key = (endpoint, method, status)
+        shard.requests[key] = shard.requests.get(key, 0) + 1
+        counts = shard.latency.get(endpoint)
+        if counts is None:
+            counts = shard.latency[endpoint] = [0] * shard.size
+        counts[bisect_left(self.buckets, seconds)] += 1
+        shard.latency_sum[endpoint] = shard.latency_sum.get(endpoint, 0.0) + seconds
+
+    def gauge(self, name, help, collect, label=None, kind="gauge"):
+        """Also export collect()'s value at each scrape: a number, or with
+        `label` a dict of {label value: number}."""
+        self._gauges.append((name, help, collect, label, kind))
+
+    # ----- exposition -----
+
+    @staticmethod
+    def _merge(into, shard):
+        # dict()/list() copies are single C calls, so they are consistent
+        # snapshots even while the owning thread keeps writing
+        for key, count in dict(shard.requests).items():
+            into.requests[key] = into.requests.get(key, 0) + count
+        for endpoint, counts in dict(shard.latency).items():
+            total = into.latency.setdefault(endpoint, [0] * into.size)
+            for i, count in enumerate(list(counts)):
+                total[i] += count
+        for endpoint, seconds in dict(shard.latency_sum).items():
+            into.latency_sum[endpoint] = into.latency_sum.get(endpoint, 0.0) + seconds
+        into.in_flight += shard.in_flight
+
+    def _snapshot(self):
+        with self._shards_lock:
+            live = []
+            for shard in self._shards:
+                if shard.thread.is_alive():
+                    live.append(shard)
+                else:
+                    self._merge(self._retired, shard)
+            self._shards = live
+            total = _Shard(self.buckets)
+            self._merge(total, self._retired)
+            for shard in live:
+                self._merge(total, shard)
+        return total
+
+    def render(self):
+        """Prometheus text exposition format."""
+        ns = self.namespace
+        total = self._snapshot()
+        lines = [f"# HELP {ns}_requests_total Requests handled.",
+                 f"# TYPE {ns}_requests_total counter"]
+        for (endpoint, method, status), count in sorted(total.requests.items()):
+            lines.append(f'{ns}_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+
+        lines += [f"# HELP {ns}_request_duration_seconds Request latency by endpoint.",
+                  f"# TYPE {ns}_request_duration_seconds histogram"]
+        for endpoint, counts in sorted(total.latency.items()):
+            cumulative = 0
+            for bound, count in zip([*map(str, self.buckets), "+Inf"], counts):
+                cumulative += count
+                lines.append(f'{ns}_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+            lines.append(f'{ns}_request_duration_seconds_sum{{endpoint="{endpoint}"}} {total.latency_sum[endpoint]:.6f}')
+            lines.append(f'{ns}_request_duration_seconds_count{{endpoint="{endpoint}"}} {cumulative}')
+
+        lines += [f"# HELP {ns}_requests_in_flight Requests being handled right now.",
+                  f"# TYPE {ns}_requests_in_flight gauge",
+                  f"{ns}_requests_in_flight {total.in_flight}"]
+
+        for name, help, collect, label, kind in self._gauges:
+            lines += [f"# HELP {ns}_{name} {help}", f"# TYPE {ns}_{name} {kind}"]
+            value = collect()
+            if label is None:
+                lines.append(f"{ns}_{name} {value}")
+            else:
+                lines += [f'{ns}_{name}{{{label}="{key}"}} {v}' for key, v in value.items()]
+        return "\n".join(lines) + "\n"
+
+
+# ---------------- Flask wiring ----------------
+
+def init_metrics(app, metrics, path="/metrics"):
+    """Record every request into `metrics` and serve them at `path`."""
+
+    @app.before_request
+    def start_request_metrics():
+        metrics.started()
+        g._metrics_started = time.perf_counter()
+
+    @app.after_request
+    def note_status(response):
+        g._metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def finish_request_metrics(exc):
+        started = g.pop("_metrics_started", None)
+        if started is None:
+            return
+        status = g.pop("_metrics_status", 500)
+        metrics.finished(request.endpoint or "unmatched", request.method, status,
+                         time.perf_counter() - started)
+
+    def metrics_view():
+        return metrics.render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+    app.add_url_rule(path, "metrics", metrics_view)
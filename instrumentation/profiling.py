@@ -0,0 +1,82 @@
+import cProfile
+import os
+import random
+import time
+from contextlib import contextmanager
+
+from flask import before_render_template, g, has_request_context, request, template_rendered
+
+# Per-request stage timings live in flask.g while instrumentation is on; with
+# it off (or outside a request) timed() does nothing.
+
+
+@contextmanager
+def timed(stage):
+    """Add the time spent in the block to `stage` of the current request."""
+    timings = g.get("_timings") if has_request_context() else None
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+
+def server_timing(timings, total):
+    """Server-Timing header value, in milliseconds."""
+    parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+# ---------------- Request instrumentation ----------------
+
+def init_profiling(app, sample_rate=0.0, slow_ms=500, profile_dir=None):
+    """Time each request's stages into a Server-Timing header.
+
+    With sample_rate > 0 that fraction of requests also runs under cProfile,
+    and those taking at least slow_ms are dumped to profile_dir as
+    <endpoint>-<timestamp>-<ms>ms.pstats (open with `python -m pstats`).
+    """
+
+    def render_started(sender, template, context, **extra):
+        g._render_started = time.perf_counter()
+
+    def render_finished(sender, template, context, **extra):
+        started = g.pop("_render_started", None)
+        timings = g.get("_timings")
+        if started is not None and timings is not None:
+            timings["render"] = timings.get("render", 0.0) + time.perf_counter() - started
+
+    before_render_template.connect(render_started, app, weak=False)
+    template_rendered.connect(render_finished, app, weak=False)
+
+    @app.before_request
+    def start_timing():
+        g._timings = {}
+        g._request_started = time.perf_counter()
+        if sample_rate and random.random() < sample_rate:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:   # another profiler is already active
+                return
+            g._profiler = profiler
+
+    @app.after_request
+    def finish_timing(response):
+        started = g.pop("_request_started", None)
+        if started is None:
+            return response
+        total = time.perf_counter() - started
+        response.headers["Server-Timing"] = server_timing(g.pop("_timings", {}), total)
+        profiler = g.pop("_profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            if total * 1000 >= slow_ms and profile_dir:
+                os.makedirs(profile_dir, exist_ok=True)
+                name = f"{request.endpoint or 'unknown'}-{int(time.time() * 1000)}-{int(total * 1000)}ms.pstats"
+                profiler.dump_stats(os.path.join(profile_dir, name))
+        return response
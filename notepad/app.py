@@ -1,21 +1,125 @@
-from flask import Flask
+import click
+from flask import Flask, request
 from blueprints.auth import auth_bp
 from blueprints.main import main_bp
+from blueprints.api import api_bp
+from utils import configure_store, SQLITE_FILE
+from hashing import configure_hashing, default_workers, HashingBusy
+from maintenance import compact_notes, format_report, CompactScheduler
+from fragment_cache import configure_fragment_cache
+from profiling import init_profiling
+from metrics import init_metrics, notepad_metrics
 import os
 
 def create_app():
     app = Flask(__name__, static_folder="static", template_folder="templates")
     app.config['SECRET_KEY'] = os.environ.get('FLASK_SECRET', 'change-me-to-a-strong-secret')
 
+    # Storage backend: "json" (data/*.json), "sharded" (one notes file per owner
+    # under data/notes/), "mmap" (record file data/notes.mmap) or "sqlite" (run
+    # migrate.py once first). On first start sharded and mmap import the json
+    # backend's notes, including its journal and cold tier. Unknown values and
+    # options the chosen backend does not support stop the app at startup.
+    app.config['NOTES_BACKEND'] = os.environ.get('NOTES_BACKEND', 'json')
+    app.config['SQLITE_PATH'] = os.environ.get('SQLITE_PATH', SQLITE_FILE)
+    # JSON backend: append mutations to data/notes.journal instead of rewriting notes.json
+    app.config['NOTES_JOURNAL'] = os.environ.get('NOTES_JOURNAL', '0') == '1'
+    app.config['NOTES_CHECKPOINT_EVERY'] = int(os.environ.get('NOTES_CHECKPOINT_EVERY', '1000'))
+    # JSON backend: keep archived notes in gzip-compressed data/notes-archive.json.gz
+    app.config['NOTES_COLD_TIER'] = os.environ.get('NOTES_COLD_TIER', '0') == '1'
+    # JSON/sharded backends: seconds between coalesced note writes (0 = write
+    # every change right away). Pending changes are flushed on exit and on
+    # SIGTERM/SIGINT; only use it with a single worker process. Setting it with
+    # the mmap or sqlite backend is an error, as they write each change in place.
+    app.config['NOTES_FLUSH_INTERVAL'] = float(os.environ.get('NOTES_FLUSH_INTERVAL', '0'))
+    # How users/notes files are written: "pretty" (indented JSON), "compact"
+    # (minified JSON) or "records" (length-prefixed binary records, see
+    # records.py). Files in any format are read; convert.py rewrites them.
+    app.config['NOTES_FILE_FORMAT'] = os.environ.get('NOTES_FILE_FORMAT', 'pretty')
+    # Request instrumentation: a Server-Timing header with the time spent in
+    # storage (or "db" for sqlite), password hashing and template rendering.
+    # PROFILE_SAMPLE_RATE of those requests also run under cProfile, and the
+    # ones slower than PROFILE_SLOW_MS are written to PROFILE_DIR as .pstats.
+    app.config['PROFILE_REQUESTS'] = os.environ.get('PROFILE_REQUESTS', '0') == '1'
+    app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+    app.config['PROFILE_SLOW_MS'] = float(os.environ.get('PROFILE_SLOW_MS', '500'))
+    app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', os.path.join(app.root_path, 'profiles'))
+    configure_store(backend=app.config['NOTES_BACKEND'],
+                    sqlite_path=app.config['SQLITE_PATH'],
+                    journal=app.config['NOTES_JOURNAL'],
+                    checkpoint_every=app.config['NOTES_CHECKPOINT_EVERY'],
+                    cold_tier=app.config['NOTES_COLD_TIER'],
+                    flush_interval=app.config['NOTES_FLUSH_INTERVAL'],
+                    file_format=app.config['NOTES_FILE_FORMAT'],
+                    timed=app.config['PROFILE_REQUESTS'])
+    if app.config['PROFILE_REQUESTS']:
+        init_profiling(app, sample_rate=app.config['PROFILE_SAMPLE_RATE'],
+                       slow_ms=app.config['PROFILE_SLOW_MS'],
+                       profile_dir=app.config['PROFILE_DIR'])
+
+    # Retention: archived notes untouched for this many days are purged by
+    # `flask notes-compact`, and by the in-process scheduler when
+    # NOTES_COMPACT_INTERVAL (hours, 0 = off) is set.
+    app.config['NOTES_RETENTION_DAYS'] = float(os.environ.get('NOTES_RETENTION_DAYS', '30'))
+    app.config['NOTES_COMPACT_INTERVAL'] = float(os.environ.get('NOTES_COMPACT_INTERVAL', '0'))
+
+    @app.cli.command("notes-compact")
+    @click.option("--retention-days", type=float, default=None,
+                  help="Purge archived notes older than this (default: NOTES_RETENTION_DAYS).")
+    @click.option("--purge-orphans", is_flag=True,
+                  help="Also delete notes whose owner has no account (run without it first to see how many).")
+    def notes_compact(retention_days, purge_orphans):
+        """Purge expired archived notes, then rewrite the store compactly."""
+        if retention_days is None:
+            retention_days = app.config['NOTES_RETENTION_DAYS']
+        click.echo(format_report(compact_notes(retention_days, purge_orphans=purge_orphans)))
+
+    if app.config['NOTES_COMPACT_INTERVAL'] > 0:
+        CompactScheduler(app.config['NOTES_COMPACT_INTERVAL'] * 3600,
+                         retention_days=app.config['NOTES_RETENTION_DAYS']).start()
+
+    # Rendered home/archive note lists kept per user (bytes, 0 = off)
+    app.config['FRAGMENT_CACHE_BYTES'] = int(os.environ.get('FRAGMENT_CACHE_BYTES', 8 * 1024 * 1024))
+    configure_fragment_cache(app.config['FRAGMENT_CACHE_BYTES'])
+
+    # Password hashing: werkzeug method string, worker processes (0 = inline on
+    # the request thread; every server worker process starts its own, so the
+    # default is at most 2) and how many jobs may wait before we answer 503.
+    # Changing the method rehashes each user's password at their next login.
+    app.config['HASH_METHOD'] = os.environ.get('HASH_METHOD', 'scrypt:32768:8:1')
+    app.config['HASH_WORKERS'] = int(os.environ.get('HASH_WORKERS', default_workers()))
+    app.config['HASH_MAX_QUEUED'] = int(os.environ.get('HASH_MAX_QUEUED', app.config['HASH_WORKERS'] * 4))
+    configure_hashing(method=app.config['HASH_METHOD'],
+                      workers=app.config['HASH_WORKERS'],
+                      max_queued=app.config['HASH_MAX_QUEUED'])
+
+    @app.errorhandler(HashingBusy)
+    def hashing_busy(e):
+        return "Server is busy, please try again in a moment.", 503, {"Retry-After": "1"}
+
+    # Prometheus-style metrics at /metrics: request counts, latency histograms
+    # per endpoint, in-flight requests, store cache and pool stats. Counters are
+    # per process. Off unless METRICS=1; the endpoint has no authentication, so
+    # only expose it where the scraper alone can reach it.
+    app.config['METRICS'] = os.environ.get('METRICS', '0') == '1'
+    if app.config['METRICS']:
+        init_metrics(app, notepad_metrics())
+
     # Register blueprints
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(main_bp, url_prefix="/")
+    app.register_blueprint(api_bp, url_prefix="/api")
 
     # ------------------------------
     # Prevent browser caching (important for logout/back button)
     # ------------------------------
     @app.after_request
     def add_no_cache_headers(response):
+        if request.blueprint == "api":
+            # Private and revalidated on every use, but storable, so clients
+            # can send If-None-Match with the ETag and get a 304
+            response.headers["Cache-Control"] = "private, no-cache"
+            return response
         response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
         response.headers["Pragma"] = "no-cache"
         response.headers["Expires"] = "0"
@@ -0,0 +1,324 @@
+"""Benchmark the notepad app on generated data.
+
+Usage (from the notepad/ folder):
+    python bench.py generate OUT_DIR [--notes 100k] [--users N] [--seed 0]
+    python bench.py run [--notes 100k] [--backend json] [--requests 200]
+                        [--save-baseline] [--tolerance 0.10]
+
+`run` copies the app to a temporary folder, generates users.json/notes.json
+there (--notes takes 1k, 100k, 1m or a number), and drives the home, edit
+note, login, register and archive routes through the Flask test client in a
+child process. It prints p50/p95/p99 latency and throughput per route and
+the child's peak RSS, then compares them with the run stored for the same
+backend and scale in bench_baseline.json (--save-baseline stores this run
+instead). It exits with status 1 if any p95 got slower than the baseline by
+more than --tolerance. Baselines only compare on the same machine.
+
+Storage options (NOTES_FILE_FORMAT, NOTES_JOURNAL, HASH_WORKERS, ...) are read
+from the environment as usual and passed through to the app.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(BASE_DIR, "bench_baseline.json")
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+PASSWORD = "bench-password"
+PASSWORD_METHOD = "scrypt:32768:8:1"
+
+# Note content sizes in characters: (share of notes, smallest, largest)
+NOTE_SIZES = ((0.70, 20, 300), (0.25, 300, 4_000), (0.05, 4_000, 64_000))
+WORDS = ("note meeting list todo idea draft plan budget call email review project "
+         "buy milk remember deadline friday report summary travel book read fix bug").split()
+
+
+def parse_scale(value):
+    value = value.lower()
+    return SCALES[value] if value in SCALES else int(value)
+
+
+# ---------------- Data generation ----------------
+
+def email_of(index):
+    return f"user{index}@example.com"
+
+
+def generate(out_dir, notes, users=None, seed=0):
+    """Write users.json and notes.json with `notes` notes spread evenly over
+    `users` users (default one per 100 notes). Note i+1 belongs to user
+    i % users; about one note in ten is archived. Returns the user count."""
+    from werkzeug.security import generate_password_hash
+
+    users = users or max(10, notes // 100)
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+
+    # Every user gets the same password, so it is hashed only once
+    password = generate_password_hash(PASSWORD, PASSWORD_METHOD)
+    with open(os.path.join(out_dir, "users.json"), "w") as f:
+        json.dump([{
+            "username": f"user{i}", "firstname": "Bench", "middlename": "", "lastname": "User",
+            "province": "Laguna", "city": "Santa Cruz", "barangay": "Duhat",
+            "contact": f"09{i + 1:09d}", "birthday": "2000-01-01", "email": email_of(i),
+            "password": password, "confirm_password": "", "age": "25", "zip_code": "4009",
+        } for i in range(users)], f, separators=(",", ":"))
+
+    # Note bodies are slices of one long random text, which is much faster
+    # than drawing every word of a million notes
+    text = " ".join(rng.choice(WORDS) for _ in range(20_000))
+    wrapped = text + text
+    shares = [share for share, _, _ in NOTE_SIZES]
+    now = time.time()
+    with open(os.path.join(out_dir, "notes.json"), "w") as f:
+        # Streamed one note at a time so 1M notes never sit in memory
+        f.write('{"notes":[')
+        for i in range(notes):
+            _, smallest, largest = rng.choices(NOTE_SIZES, shares)[0]
+            size = rng.randint(smallest, largest)
+            start = rng.randrange(len(text))
+            content = wrapped[start:start + size]
+            note = {"id": i + 1, "owner": email_of(i % users),
+                    "title": " ".join(rng.choices(WORDS, k=rng.randint(1, 6))),
+                    "content": content,
+                    "status": "archived" if rng.random() < 0.1 else "active",
+                    "updated_at": now - (notes - i)}
+            if i:
+                f.write(",")
+            f.write(json.dumps(note, separators=(",", ":")))
+        f.write("]}")
+    return users
+
+
+# ---------------- Driving the app (child process) ----------------
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list."""
+    index = max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed):
+    values = sorted(latencies)
+    return {"requests": len(values),
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "rps": len(values) / elapsed if elapsed else 0.0}
+
+
+def peak_rss():
+    """Peak resident set size of this process in bytes, or None where unknown."""
+    try:
+        import resource
+    except ImportError:   # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def drive(users, notes, requests, seed=0):
+    """Run every scenario `requests` times against the app in this folder."""
+    from app import create_app
+
+    rng = random.Random(seed)
+    app = create_app()
+    app.config["TESTING"] = True
+    client = app.test_client()
+    results = {}
+
+    def start_session(user):
+        # A fresh session for every request: logged in as `user`, or logged
+        # out with user=None. Redirects are not followed, so flashed messages
+        # would otherwise pile up in the cookie.
+        with client.session_transaction() as session:
+            session.clear()
+            if user is not None:
+                session["username"] = email_of(user)
+
+    def note_of(user):
+        # Note ids of `user` are user+1, user+1+users, user+1+2*users, ...
+        per_user = (notes - user - 1) // users + 1
+        return user + 1 + rng.randrange(per_user) * users
+
+    def run(name, request, expect=200, logged_in=True):
+        latencies = []
+        elapsed = 0.0
+        for i in range(requests):
+            user = rng.randrange(users)
+            start_session(user if logged_in else None)
+            t = time.perf_counter()
+            response = request(i, user)
+            latencies.append(time.perf_counter() - t)
+            elapsed += latencies[-1]
+            if response.status_code != expect:
+                raise RuntimeError(f"{name}: HTTP {response.status_code}, expected {expect}")
+        results[name] = summarize(latencies, elapsed)
+
+    # The first request loads the store; report it on its own
+    start_session(0)
+    t = time.perf_counter()
+    client.get("/home")
+    first_request = time.perf_counter() - t
+
+    def home(i, user):
+        return client.get("/home")
+
+    def edit_get(i, user):
+        return client.get(f"/note/edit/{note_of(user)}")
+
+    def edit_post(i, user):
+        return client.post(f"/note/edit/{note_of(user)}",
+                           data={"title": f"edited {i}", "content": f"edited content {i} " * 20})
+
+    def archive(i, user):
+        return client.get("/archive")
+
+    def archive_note(i, user):
+        note_id = note_of(user)
+        client.post(f"/note/delete/{note_id}")
+        return client.post(f"/archive/restore/{note_id}")
+
+    def login(i, user):
+        return client.post("/auth/login", data={"email": email_of(user), "password": PASSWORD})
+
+    def register(i, user):
+        return client.post("/auth/register", data={
+            "username": f"bench{i}", "firstname": "Bench", "lastname": "Register",
+            "province": "Laguna", "city": "Santa Cruz", "contact": f"09{900_000_000 + i}",
+            "birthday": "2000-01-01", "email": f"bench{i}@example.com",
+            "password": PASSWORD, "confirm_password": PASSWORD})
+
+    run("main.home", home)
+    run("main.edit_note GET", edit_get)
+    run("main.edit_note POST", edit_post, expect=302)
+    run("main.archive", archive)
+    run("main.delete_note + archive_restore", archive_note, expect=302)
+    run("auth_bp.login", login, expect=302, logged_in=False)
+    run("auth_bp.register", register, expect=302, logged_in=False)
+    return {"first_request_s": first_request, "peak_rss_bytes": peak_rss(), "routes": results}
+
+
+# ---------------- Reporting ----------------
+
+def format_run(result):
+    rss = result["peak_rss_bytes"]
+    lines = [f"first request (store load): {result['first_request_s']:.3f}s, "
+             f"peak RSS: {'n/a' if rss is None else f'{rss / 2**20:.1f} MiB'}",
+             f"{'route':<36}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}"]
+    for name, r in result["routes"].items():
+        lines.append(f"{name:<36}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['rps']:>10.1f}")
+    return "\n".join(lines)
+
+
+def compare(result, baseline, tolerance):
+    """Lines comparing result with baseline, and the routes whose p95 regressed."""
+    def change(new, old):
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    lines = [f"{'vs baseline':<36}{'p50':>10}{'p95':>10}{'p99':>10}{'req/s':>10}"]
+    regressed = []
+    for name, r in result["routes"].items():
+        old = baseline["routes"].get(name)
+        if old is None:
+            continue
+        lines.append(f"{name:<36}{change(r['p50_ms'], old['p50_ms']):>10}{change(r['p95_ms'], old['p95_ms']):>10}"
+                     f"{change(r['p99_ms'], old['p99_ms']):>10}{change(r['rps'], old['rps']):>10}")
+        if r["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+            regressed.append(name)
+    if result["peak_rss_bytes"] and baseline.get("peak_rss_bytes"):
+        lines.append(f"peak RSS {change(result['peak_rss_bytes'], baseline['peak_rss_bytes'])}")
+    return lines, regressed
+
+
+def bench(notes, users, requests, backend, seed, keep=None):
+    """Generate data in a throwaway copy of the app and drive it in a child process."""
+    work = keep or tempfile.mkdtemp(prefix="notepad-bench-")
+    try:
+        shutil.rmtree(work, ignore_errors=True)
+        shutil.copytree(BASE_DIR, work, ignore=shutil.ignore_patterns(
+            "data", "profiles", "__pycache__", "bench_baseline.json"))
+        print(f"Generating {notes} notes in {work} ...", file=sys.stderr)
+        users = generate(os.path.join(work, "data"), notes, users, seed)
+        env = dict(os.environ, NOTES_BACKEND=backend)
+        env.pop("SQLITE_PATH", None)
+        if backend == "sqlite":
+            subprocess.run([sys.executable, "migrate.py"], cwd=work, env=env, check=True,
+                           stdout=subprocess.DEVNULL)
+        args = json.dumps({"users": users, "notes": notes, "requests": requests, "seed": seed})
+        child = subprocess.run([sys.executable, "bench.py", "drive", args], cwd=work, env=env,
+                               check=True, stdout=subprocess.PIPE, text=True)
+        return json.loads(child.stdout.strip().splitlines()[-1])
+    finally:
+        if keep is None:
+            shutil.rmtree(work, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the notepad app on generated data.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    gen = commands.add_parser("generate", help="write users.json and notes.json")
+    gen.add_argument("out_dir")
+    gen.add_argument("--notes", type=parse_scale, default="100k")
+    gen.add_argument("--users", type=int)
+    gen.add_argument("--seed", type=int, default=0)
+
+    run = commands.add_parser("run", help="generate data, drive the app and report")
+    run.add_argument("--notes", type=parse_scale, default="100k", help="1k, 100k, 1m or a number")
+    run.add_argument("--users", type=int)
+    run.add_argument("--requests", type=int, default=200, help="requests per route")
+    run.add_argument("--backend", default=os.environ.get("NOTES_BACKEND", "json"),
+                     choices=("json", "sharded", "mmap", "sqlite"))
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--baseline", default=BASELINE_FILE)
+    run.add_argument("--save-baseline", action="store_true")
+    run.add_argument("--tolerance", type=float, default=0.10, help="allowed p95 slowdown (0.10 = 10%%)")
+    run.add_argument("--keep", metavar="DIR", help="work in DIR and keep it afterwards")
+
+    drv = commands.add_parser("drive")   # internal: runs in the child process
+    drv.add_argument("config")
+
+    args = parser.parse_args(argv)
+    if args.command == "generate":
+        users = generate(args.out_dir, args.notes, args.users, args.seed)
+        print(f"Wrote {users} users and {args.notes} notes to {args.out_dir}")
+        return 0
+    if args.command == "drive":
+        print(json.dumps(drive(**json.loads(args.config))))
+        return 0
+
+    result = bench(args.notes, args.users, args.requests, args.backend, args.seed, args.keep)
+    print(f"backend={args.backend} notes={args.notes} requests/route={args.requests}")
+    print(format_run(result))
+
+    key = f"{args.backend}/{args.notes}"
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+    if args.save_baseline:
+        baselines[key] = result
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=4)
+        print(f"Saved as the {key} baseline in {args.baseline}")
+        return 0
+    if key not in baselines:
+        print(f"No {key} baseline yet (run again with --save-baseline)")
+        return 0
+    lines, regressed = compare(result, baselines[key], args.tolerance)
+    print("\n".join(lines))
+    if regressed:
+        print(f"p95 regressed by more than {args.tolerance:.0%}: {', '.join(regressed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from functools import wraps
+from flask import Blueprint, current_app, jsonify, request, session, url_for
+from utils import add_note, get_note, page_notes, patch_note, soft_delete_note, notes_version, note_etag
+from store import STATUSES, NoteConflict
+
+
+api_bp = Blueprint("api", __name__)
+
+MAX_PAGE_SIZE = 100
+
+def api_login_required(fn):
+    @wraps(fn)
+    def wrapper(*a, **kw):
+        if "username" not in session:
+            return jsonify(error="Login required."), 401
+        return fn(*a, **kw)
+    return wrapper
+
+def conditional(etag, build):
+    """304 if the client already holds `etag`, else the JSON from build().
+    build() only runs when the body is actually needed."""
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    return response
+
+def note_response(note, status=200):
+    response = jsonify(note)
+    response.status_code = status
+    response.set_etag(note_etag(note))
+    return response
+
+def conflict(note):
+    """409 carrying the note as it is now, so the client can merge."""
+    response = jsonify(error="The note was changed elsewhere.", note=note)
+    response.status_code = 409
+    response.set_etag(note_etag(note))
+    return response
+
+def json_fields():
+    """title/content from the JSON body, or None if the body is not a JSON object."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return None
+    return {k: data[k].strip() for k in ("title", "content") if isinstance(data.get(k), str)}
+
+@api_bp.route("/notes", methods=("GET",))
+@api_login_required
+def list_notes():
+    user = session["username"]
+    status = request.args.get("status", "active")
+    if status not in STATUSES:
+        return jsonify(error="Unknown status."), 400
+    limit = min(request.args.get("limit", 20, type=int), MAX_PAGE_SIZE)
+    if limit < 1:
+        return jsonify(error="limit must be at least 1."), 400
+    cursor = request.args.get("before")
+
+    def build():
+        notes, next_cursor = page_notes(user, status, limit, cursor)
+        return {"notes": notes, "next": next_cursor}
+
+    # The version covers every note of the user, so any change to them
+    # changes the ETag of every page
+    return conditional(notes_version(user), build)
+
+@api_bp.route("/notes/<int:note_id>", methods=("GET",))
+@api_login_required
+def get(note_id):
+    note = get_note(session["username"], note_id)
+    if not note:
+        return jsonify(error="Note not found."), 404
+    return conditional(note_etag(note), lambda: note)
+
+@api_bp.route("/notes", methods=("POST",))
+@api_login_required
+def create():
+    fields = json_fields()
+    if fields is None:
+        return jsonify(error="Expected a JSON object."), 400
+    if not fields.get("title"):
+        return jsonify(error="Title is required!"), 400
+    note = add_note(session["username"], fields["title"], fields.get("content", ""))
+    response = note_response(note, 201)
+    response.headers["Location"] = url_for("api.get", note_id=note["id"])
+    return response
+
+def apply_splice(content, splice):
+    """content with content[start:end] replaced by text, or None if the splice is malformed."""
+    if not isinstance(splice, dict):
+        return None
+    start, end, text = splice.get("start"), splice.get("end"), splice.get("text")
+    if not (isinstance(start, int) and isinstance(end, int) and isinstance(text, str)
+            and 0 <= start <= end <= len(content)):
+        return None
+    return content[:start] + text + content[end:]
+
+@api_bp.route("/notes/<int:note_id>", methods=("PATCH",))
+@api_login_required
+def patch(note_id):
+    """Change only the fields sent: "title", "content", or "content_splice"
+    ({"start", "end", "text"} applied to the stored content). With
+    "updated_at" (the value the client last saw) the change is refused with
+    409 and the current note if someone else saved in between. Content is
+    stored as sent, unstripped, so a client's next splice lines up."""
+    user = session["username"]
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify(error="Expected a JSON object."), 400
+    seen = data.get("updated_at")
+    if seen is not None and not isinstance(seen, (int, float)):
+        return jsonify(error="updated_at must be a number."), 400
+    if "content_splice" in data and seen is None:
+        return jsonify(error="content_splice needs updated_at."), 400
+
+    note = get_note(user, note_id)
+    if not note:
+        return jsonify(error="Note not found."), 404
+    if seen is not None and seen != note["updated_at"]:
+        return conflict(note)
+
+    fields = {}
+    if isinstance(data.get("title"), str):
+        if not data["title"].strip():
+            return jsonify(error="Title is required!"), 400
+        fields["title"] = data["title"].strip()
+    if isinstance(data.get("content"), str):
+        fields["content"] = data["content"]
+    elif "content_splice" in data:
+        fields["content"] = apply_splice(note["content"], data["content_splice"])
+        if fields["content"] is None:
+            return jsonify(error="Bad content_splice."), 400
+    fields = {k: v for k, v in fields.items() if v != note[k]}
+    if not fields:
+        return note_response(note)
+    try:
+        note = patch_note(user, note_id, fields, seen)
+    except NoteConflict as e:
+        return conflict(e.note)
+    if note is None:   # deleted since get_note
+        return jsonify(error="Note not found."), 404
+    return note_response(note)
+
+@api_bp.route("/notes/<int:note_id>/archive", methods=("POST",))
+@api_login_required
+def archive(note_id):
+    note = soft_delete_note(session["username"], note_id)
+    if not note:
+        return jsonify(error="Note not found."), 404
+    return note_response(note)
@@ -1,16 +1,9 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from utils import load_json, save_json, hash_password, verify_password, generate_otp
+from utils import hash_password, verify_password, needs_rehash, generate_otp, find_user, find_user_by_username, find_user_by_contact, add_user, update_user_profile
 import datetime
-import os
 import time
 import re
 
-from utils import load_json as load_data, save_json as save_data
-
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-USERS_FILE = os.path.join(BASE_DIR, "data", "users.json")
-NOTES_FILE = os.path.join(BASE_DIR, "data", "notes.json")
-
 auth_bp = Blueprint('auth_bp', __name__, template_folder='../templates')
 
 
@@ -18,7 +11,6 @@ auth_bp = Blueprint('auth_bp', __name__, template_folder='../templates')
 @auth_bp.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
-        data = load_data(USERS_FILE)
         errors = {}
 
         form_data = {
@@ -49,7 +41,7 @@ def register():
             errors['username'] = 'Invalid username format.'
         elif len(form_data['username'].replace(' ', '')) < 2:
             errors['username'] = 'Username must be at least 2 characters long.'
-        elif any(u.get('username') == form_data['username'] for u in data):
+        elif find_user_by_username(form_data['username']):
             errors['username'] = 'Username already exists.'
         
         
@@ -82,7 +74,7 @@ def register():
         elif re.match(r'^09(\d)\1{8}$', form_data['contact']):
             errors['contact'] = 'Contact number digits cannot all be the same.'
         # ✅ FIX: Check for contact number uniqueness
-        elif any(u.get('contact') == form_data['contact'] for u in data):
+        elif find_user_by_contact(form_data['contact']):
              errors['contact'] = 'Contact number is already in use.'
 
 
@@ -91,7 +83,7 @@ def register():
         EMAIL_REGEX = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.' + ALLOWED_DOMAINS_PATTERN + r'$'
         if not re.match(EMAIL_REGEX, form_data['email']):
             errors['email'] = 'Invalid email address.'
-        elif any(u.get('email') == form_data['email'] for u in data):
+        elif find_user(form_data['email']):
             errors['email'] = 'Email already exists.'
 
         # 7. Location validation (Province & City required)
@@ -125,8 +117,7 @@ def register():
         # --- Success ---
         hashed_password = hash_password(form_data['password'])
         final_user_data = {**form_data, 'password': hashed_password}
-        data.append(final_user_data)
-        save_data(USERS_FILE, data)
+        add_user(final_user_data)
         flash('Registration successful.', 'success')
         return redirect(url_for('auth_bp.login'))
         
@@ -136,8 +127,6 @@ def register():
 # ---------------- Login ----------------
 @auth_bp.route('/login', methods=['GET', 'POST'])
 def login():
-    data = load_json(USERS_FILE)
-
     if request.method == 'POST':
         email = request.form.get('email', '').strip()
         password = request.form.get('password', '').strip()
@@ -159,9 +148,12 @@ def login():
             )
             
         # 2. Authenticate using HASHED password
-        user = next((u for u in data if u['email'] == email), None)
+        user = find_user(email)
         
         if user and verify_password(password, user['password']):
+            # Upgrade the stored hash if the hashing parameters changed since it was made
+            if needs_rehash(user['password']):
+                update_user_profile(user['email'], {'password': hash_password(password)})
             session['username'] = user['email']
             flash('Login successful.', "success")
             return redirect(url_for('main.home'))
@@ -187,7 +179,6 @@ def logout():
 def forgot():
     if request.method == 'POST':
         email = request.form.get('username', '').strip()
-        data = load_json(USERS_FILE)
 
         errors = {}
         
@@ -200,7 +191,7 @@ def forgot():
              return render_template('forgot.html', errors=errors, entered_email=email)
 
         # 3. Check if email exists
-        user = next((u for u in data if u['email'] == email), None)
+        user = find_user(email)
         
         # FIX: Display "Email not found" as a field-level error
         if not user:
@@ -291,8 +282,7 @@ def resend_otp():
         flash("Session expired. Please re-enter your email.")
         return redirect(url_for('auth_bp.forgot'))
 
-    data = load_json(USERS_FILE)
-    user = next((u for u in data if u['email'] == email), None)
+    user = find_user(email)
     
     # 2. FIX: Display "Email not found" as a field-level error on the /forgot page
     if not user:
@@ -331,30 +321,22 @@ def reset_password():
             flash("Session expired. Please try again.", "error")
             return redirect(url_for('auth_bp.forgot'))
 
-        data = load_json(USERS_FILE)
-        
         # 3. Find user and perform password comparison
-        user_found = False
-        for user in data:
-            if user['email'] == email:
-                user_found = True
-                
-                # Check new password against current HASHED password
-                current_password_hash = user.get('password') 
-                
-                if verify_password(pw, current_password_hash):
-                    flash("The new password cannot be the same as your current password.", "warning")
-                    return redirect(url_for('auth_bp.reset_password'))
-                
-                # Update password with the new hash
-                user['password'] = hash_password(pw)
-                break
+        user = find_user(email)
         
-        if not user_found:
+        if not user:
             flash("User not found.", "error")
             return redirect(url_for('auth_bp.forgot'))
 
-        save_json(USERS_FILE, data)
+        # Check new password against current HASHED password
+        current_password_hash = user.get('password') 
+        
+        if verify_password(pw, current_password_hash):
+            flash("The new password cannot be the same as your current password.", "warning")
+            return redirect(url_for('auth_bp.reset_password'))
+        
+        # Update password with the new hash
+        update_user_profile(email, {'password': hash_password(pw)})
 
         # Clear session data
         session.pop('reset_otp', None)
@@ -1,14 +1,19 @@
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash
-from utils import add_note, load_notes, update_note, soft_delete_note, load_users, restore_note, permanently_delete_note, update_user_profile,generate_otp,update_note_owner
-import time, random
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, Response, jsonify
+from markupsafe import Markup
+from utils import add_note, page_notes, search_notes, get_note, update_note, soft_delete_note, find_user, find_user_by_contact, restore_note, permanently_delete_note, soft_delete_notes, restore_notes, permanently_delete_notes, update_user_profile,generate_otp,update_note_owner, iter_notes, import_notes, note_revisions, note_revision, notes_version
+from fragment_cache import get_fragment_cache
+import json, time, random
 import re,datetime
 
 
 main_bp = Blueprint("main", __name__)
 
+PAGE_SIZE = 20  # notes per page on home/archive
+NOTE_LIST_TEMPLATES = {"active": "home_notes.html", "archived": "archive_notes.html"}
+
 def login_required(fn):
     from functools import wraps
     @wraps(fn)
@@ -18,6 +23,20 @@ def login_required(fn):
         return fn(*a, **kw)
     return wrapper
 
+def note_list_html(user, status, cursor=None):
+    """Rendered note list for home ("active") or archive ("archived").
+    Cached per user and keyed by the version of their notes, so a hit skips
+    both the store query and the template."""
+    cache = get_fragment_cache()
+    version = notes_version(user)
+    html = cache.get(user, version, (status, cursor))
+    if html is None:
+        notes, next_cursor = page_notes(user, status, PAGE_SIZE, cursor)
+        html = render_template(NOTE_LIST_TEMPLATES[status], notes=notes,
+                               next_cursor=next_cursor, paged=bool(cursor))
+        cache.put(user, version, (status, cursor), html)
+    return Markup(html)
+
 @main_bp.route("/")
 def index():
     if "username" in session:
@@ -37,15 +56,13 @@ def home():
         add_note(user, title, content)
         flash("Note added successfully!", "success")
         return redirect(url_for("main.home"))
-    notes = [n for n in load_notes() if n["owner"] == user and n["status"] == "active"]
-    return render_template("home.html", notes=sorted(notes, key=lambda x: x["updated_at"], reverse=True))
+    return render_template("home.html", notes_html=note_list_html(user, "active", request.args.get("before")))
 
 @main_bp.route("/note/edit/<int:note_id>", methods=("GET", "POST"))
 @login_required
 def edit_note(note_id):
     user = session["username"]
-    notes = load_notes()
-    note = next((n for n in notes if n["id"] == note_id and n["owner"] == user), None)
+    note = get_note(user, note_id)
 
     if not note:
         flash("Note not found.", "error")
@@ -57,10 +74,14 @@ def edit_note(note_id):
 
         if not title:
             flash("Title is required!", "error")
-            return render_template("edit_note.html", note=note)
+            return render_edit_note(note)
 
         # 🟡 Check if no changes were made
         if title == note["title"] and content == note["content"]:
+            if request.form.get("autosaved"):
+                # Everything was already saved by the page's autosave
+                flash("Note updated successfully!", "success")
+                return redirect(url_for("main.home"))
             flash("No changes detected.", "warning")
             return redirect(url_for("main.edit_note", note_id=note_id))
 
@@ -69,15 +90,39 @@ def edit_note(note_id):
         flash("Note updated successfully!", "success")
         return redirect(url_for("main.home"))
 
-    return render_template("edit_note.html", note=note)
+    return render_edit_note(note)
+
+def render_edit_note(note):
+    """edit_note.html with the note's history; ?rev=N also shows that revision."""
+    user = session["username"]
+    rev = request.args.get("rev", type=int)
+    return render_template(
+        "edit_note.html",
+        note=note,
+        revisions=note_revisions(user, note["id"]),
+        revision=note_revision(user, note["id"], rev) if rev else None,
+        datetime=datetime.datetime
+    )
+
+@main_bp.route("/note/<int:note_id>/history/<int:rev>/restore", methods=("POST",))
+@login_required
+def restore_revision(note_id, rev):
+    user = session["username"]
+    revision = note_revision(user, note_id, rev)
+    if not revision:
+        flash("Revision not found.", "error")
+        return redirect(url_for("main.edit_note", note_id=note_id))
+    # The version being replaced goes into the history too, so this can be undone
+    update_note(user, note_id, revision["title"], revision["content"])
+    flash(f"Restored revision {rev}.", "success")
+    return redirect(url_for("main.edit_note", note_id=note_id))
 
 
 @main_bp.route("/profile/edit", methods=["GET", "POST"])
 @login_required
 def edit_profile():
-    users = load_users()
     user_email = session["username"]
-    user = next((u for u in users if u["email"] == user_email), None)
+    user = find_user(user_email)
     if not user:
         flash("User not found.", "error")
         return redirect(url_for("main.profile"))
@@ -133,13 +178,24 @@ def delete_note(note_id):
 @login_required
 def archive():
     user = session["username"]
-    notes = [n for n in load_notes() if n["owner"] == user and n["status"] == "archived"]
     return render_template(
         "archive.html",
-        notes=sorted(notes, key=lambda x: x["updated_at"], reverse=True),
+        notes_html=note_list_html(user, "archived", request.args.get("before")),
         user=user
     )
 
+@main_bp.route("/search")
+@login_required
+def search():
+    user = session["username"]
+    query = request.args.get("q", "").strip()
+    status = "archived" if request.args.get("status") == "archived" else "active"
+    template = "archive.html" if status == "archived" else "home.html"
+    if not query:
+        return redirect(url_for("main.archive" if status == "archived" else "main.home"))
+    notes_html = Markup(render_template(NOTE_LIST_TEMPLATES[status], notes=search_notes(user, query, status), query=query))
+    return render_template(template, notes_html=notes_html, query=query, user=user)
+
 @main_bp.route("/archive/restore/<int:note_id>", methods=("POST",))
 @login_required
 def archive_restore(note_id):
@@ -157,14 +213,65 @@ def archive_delete(note_id):
     flash("Note deleted permanently!", "error")
     return redirect(url_for("main.archive"))
 
+@main_bp.route("/notes/bulk", methods=("POST",))
+@login_required
+def bulk_notes():
+    user = session["username"]
+    action = request.form.get("action", "")
+    note_ids = [int(i) for i in request.form.getlist("note_ids") if i.isdecimal()]
+    back = url_for("main.home") if action == "archive" else url_for("main.archive")
+
+    if not note_ids:
+        flash("No notes selected.", "warning")
+        return redirect(back)
+
+    if action == "archive":
+        count = soft_delete_notes(user, note_ids)
+        flash(f"{count} note(s) archived successfully!", "info")
+    elif action == "restore":
+        count = restore_notes(user, note_ids)
+        flash(f"{count} note(s) restored successfully!", "success")
+    elif action == "delete":
+        count = permanently_delete_notes(user, note_ids)
+        flash(f"{count} note(s) deleted permanently!", "error")
+    else:
+        flash("Unknown action.", "error")
+    return redirect(back)
+
+@main_bp.route("/notes/export")
+@login_required
+def export_notes():
+    """All of the user's notes as NDJSON, streamed one page of notes at a time."""
+    user = session["username"]
+    lines = (json.dumps(note) + "\n" for note in iter_notes(user))
+    return Response(lines, mimetype="application/x-ndjson",
+                    headers={"Content-Disposition": "attachment; filename=notes.ndjson"})
+
+@main_bp.route("/notes/import", methods=("POST",))
+@login_required
+def import_notes_upload():
+    """Add notes from an NDJSON upload (form field "file") or an NDJSON request body.
+    Lines are read one by one and added in batches."""
+    user = session["username"]
+    if request.mimetype == "application/x-ndjson":
+        imported, skipped = import_notes(user, request.stream)
+        return jsonify(imported=imported, skipped=skipped)
+    upload = request.files.get("file")
+    if not upload or not upload.filename:
+        flash("Choose a .ndjson file to import.", "warning")
+        return redirect(url_for("main.home"))
+    imported, skipped = import_notes(user, upload.stream)
+    flash(f"{imported} note(s) imported" + (f", {skipped} line(s) skipped." if skipped else "."),
+          "success" if imported else "warning")
+    return redirect(url_for("main.home"))
+
 # main.py (Updated @main_bp.route("/profile", ...) function)
 @main_bp.route("/profile", methods=["GET", "POST"])
 @login_required
 def profile():
-    users = load_users()
     user_email = session["username"]
 
-    user = next((u for u in users if u["email"] == user_email), None)
+    user = find_user(user_email)
     if not user:
         flash("User not found.", "error")
         return redirect(url_for("main.home"))
@@ -223,6 +330,7 @@ def profile():
 
         # 4. Contact Number Validation
         new_contact = updated_profile['contact']
+        contact_owner = find_user_by_contact(new_contact)
         
         # Check 1: Format
         if 'contact' not in errors and not re.match(r'^09\d{9}$', new_contact):
@@ -231,7 +339,7 @@ def profile():
         elif 'contact' not in errors and re.match(r'^09(\d)\1{8}$', new_contact):
             errors['contact'] = 'Contact number digits cannot all be the same.'
         # ✅ FIX: Check 3: Uniqueness (only against other users)
-        elif 'contact' not in errors and any(u.get('contact') == new_contact for u in users if u.get('email') != user_email):
+        elif 'contact' not in errors and contact_owner and contact_owner.get('email') != user_email:
             errors['contact'] = 'Contact number is already in use by another account.'
         
         # 5. Location Validation
@@ -255,7 +363,7 @@ def profile():
         # 7. Email Check (If email changed, check for existing user)
         if 'email' not in errors and updated_profile['email']:
             email_changed = new_email != user_email
-            if email_changed and any(u.get('email') == new_email for u in users if u.get('email') != user_email):
+            if email_changed and find_user(new_email):
                 errors['email'] = f"Email address {new_email} is already in use."
 
         # 🛑 Process Errors
@@ -0,0 +1,38 @@
+"""Rewrite data/users.json and data/notes.json (or the given files) in another file format.
+
+Usage (from the notepad/ folder):
+    python convert.py {pretty,compact,records} [file ...]
+
+Files are read in whatever format they are in now, so this also converts back.
+Run it while the app is stopped.
+"""
+import os
+import sys
+
+from utils import USERS_FILE, NOTES_FILE, NOTES_SHARD_DIR, FILE_FORMATS as FORMATS, load_json, save_json
+
+
+def default_files():
+    files = [USERS_FILE, NOTES_FILE]
+    if os.path.isdir(NOTES_SHARD_DIR):
+        files += [e.path for e in os.scandir(NOTES_SHARD_DIR) if e.name.endswith(".json")]
+    return [path for path in files if os.path.exists(path)]
+
+
+def convert(paths, file_format):
+    """Rewrite each file in file_format. Returns [(path, bytes_before, bytes_after)]."""
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown file format: {file_format!r}")
+    results = []
+    for path in paths:
+        before = os.path.getsize(path)
+        save_json(path, load_json(path), file_format)
+        results.append((path, before, os.path.getsize(path)))
+    return results
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in FORMATS:
+        sys.exit(__doc__)
+    for path, before, after in convert(sys.argv[2:] or default_files(), sys.argv[1]):
+        print(f"{path}: {before} -> {after} bytes")
@@ -0,0 +1,90 @@
+import atexit
+import logging
+import os
+import signal
+import threading
+
+
+# ---------------- Write-behind flusher ----------------
+
+class Flusher:
+    """Calls `flush` every `interval` seconds on a background thread.
+
+    Stores opened with write_behind=True apply mutations in memory and leave
+    them pending; this turns any burst of edits into one disk write per
+    interval. It also flushes at interpreter exit and on SIGTERM/SIGINT (the
+    thread writes, then the signal takes its usual course), so a normal
+    shutdown loses nothing.
+    """
+
+    def __init__(self, flush, interval=1.0):
+        self.flush = flush
+        self.interval = interval
+        self._stop = threading.Event()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="notes-flusher", daemon=True)
+        self._previous_handlers = {}
+        self._signum = None            # signal waiting for the final flush
+        self._signal_flushed = False
+
+    def start(self):
+        self._thread.start()
+        atexit.register(self.stop)
+        # Signal handlers can only be installed from the main thread
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                self._previous_handlers[signum] = signal.signal(signum, self._on_signal)
+        return self
+
+    def _flush(self):
+        try:
+            self.flush()
+        except Exception:
+            # Pending records stay queued and are retried next interval
+            logging.getLogger(__name__).exception("Flushing notes failed")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._flush()
+        if self._signum is not None:
+            # The final flush for _on_signal, which can't do it itself: the
+            # signal may have interrupted the main thread inside a store write,
+            # holding the locks flush() needs until the handler returns
+            self._flush()
+            self._signal_flushed = True
+            os.kill(os.getpid(), self._signum)
+
+    def stop(self):
+        """Stop the thread and write whatever is still pending."""
+        if self._stopped:
+            return
+        self._stopped = True
+        self._stop.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.flush()
+        atexit.unregister(self.stop)
+        self._restore_handlers()
+
+    def _restore_handlers(self):
+        if threading.current_thread() is not threading.main_thread():
+            return
+        for signum, handler in self._previous_handlers.items():
+            if signal.getsignal(signum) == self._on_signal:
+                signal.signal(signum, handler)
+        self._previous_handlers = {}
+
+    def _on_signal(self, signum, frame):
+        if not self._signal_flushed and self._thread.is_alive():
+            # Only wake the flusher thread; it sends the signal again once done
+            self._signum = signum
+            self._stop.set()
+            return
+        previous = self._previous_handlers.get(signum)
+        self._restore_handlers()
+        if callable(previous):
+            previous(signum, frame)
+        elif previous != signal.SIG_IGN:
+            # Default action: re-raise with the default handler in place
+            signal.signal(signum, signal.SIG_DFL)
+            signal.raise_signal(signum)
@@ -0,0 +1,82 @@
+import threading
+from collections import OrderedDict
+
+
+# ---------------- Rendered fragment cache ----------------
+
+class FragmentCache:
+    """LRU of rendered HTML fragments, bounded by their total size in bytes.
+
+    Entries belong to an owner and a version of the owner's notes (see
+    utils.notes_version). Storing an entry for a newer version drops that
+    owner's older entries, so any change to their notes invalidates what
+    was rendered before it. max_bytes=0 disables the cache.
+    """
+
+    def __init__(self, max_bytes=8 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # (owner, key) -> (html, size)
+        self._owners = {}               # owner -> (version, {key, ...})
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, owner, version, key):
+        with self._lock:
+            current = self._owners.get(owner)
+            entry = self._entries.get((owner, key)) if current and current[0] == version else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((owner, key))
+            self.hits += 1
+            return entry[0]
+
+    def put(self, owner, version, key, html):
+        size = len(html.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            current = self._owners.get(owner)
+            if current is None or current[0] != version:
+                self._drop_owner(owner)
+                current = self._owners[owner] = (version, set())
+            self._remove((owner, key))
+            self._entries[(owner, key)] = (html, size)
+            current[1].add(key)
+            self.size += size
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, entry_key):
+        entry = self._entries.pop(entry_key, None)
+        if entry is None:
+            return
+        self.size -= entry[1]
+        owner, key = entry_key
+        keys = self._owners[owner][1]
+        keys.discard(key)
+        if not keys:
+            del self._owners[owner]
+
+    def _drop_owner(self, owner):
+        for key in list(self._owners.get(owner, (None, ()))[1]):
+            self._remove((owner, key))
+        self._owners.pop(owner, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._owners.clear()
+            self.size = 0
+
+
+_cache = FragmentCache()
+
+def configure_fragment_cache(max_bytes):
+    global _cache
+    _cache = FragmentCache(max_bytes)
+
+def get_fragment_cache():
+    return _cache
@@ -0,0 +1,109 @@
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing pool is saturated; the app answers 503."""
+
+
+# ---------------- Password hashing pool ----------------
+
+def default_workers():
+    return min(2, os.cpu_count() or 1)
+
+
+def _mp_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class HashingPool:
+    """Runs werkzeug password hashing in a process pool off the request thread.
+
+    At most `workers + max_queued` jobs are admitted at once; further calls
+    raise HashingBusy immediately instead of queueing behind a burst.
+    With workers=0 hashing runs inline (no pool, no admission limit).
+
+    Every worker process of the web server gets its own pool, so keep
+    `workers` small. The pool is started lazily, from a request thread, so
+    its processes come from a forkserver (spawn on Windows) rather than a
+    fork of the multi-threaded app process.
+    """
+
+    def __init__(self, method="scrypt:32768:8:1", workers=None, max_queued=None, timeout=10):
+        self.method = method
+        self.workers = default_workers() if workers is None else workers
+        self.max_queued = self.workers * 4 if max_queued is None else max_queued
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.capacity())
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._method_prefix = None
+
+    def _pool(self):
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=_mp_context())
+        return self._executor
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = self._pool().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise HashingBusy()
+
+    def hash(self, pw):
+        return self._run(generate_password_hash, pw, self.method)
+
+    def verify(self, pw, h):
+        return self._run(check_password_hash, h, pw)
+
+    def capacity(self):
+        """How many jobs may be admitted at once (running plus queued)."""
+        return max(1, self.workers + self.max_queued)
+
+    def in_use(self):
+        """Jobs admitted right now (0 when hashing runs inline)."""
+        return self.capacity() - self._slots._value if self.workers else 0
+
+    def needs_rehash(self, h):
+        """True if `h` was made with different parameters than the current method."""
+        if self._method_prefix is None:
+            # Expand shorthands like "scrypt" to the full "scrypt:32768:8:1"
+            self._method_prefix = generate_password_hash("", self.method).split("$", 1)[0]
+        return h.split("$", 1)[0] != self._method_prefix
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_pool = HashingPool(workers=0)
+
+def configure_hashing(**options):
+    """Replace the pool (method, workers, max_queued, timeout)."""
+    global _pool
+    _pool.shutdown()
+    _pool = HashingPool(**options)
+
+def get_hashing_pool():
+    return _pool
+
+atexit.register(lambda: _pool.shutdown())
@@ -0,0 +1,146 @@
+import json
+import os
+import struct
+import time
+import zlib
+from difflib import SequenceMatcher
+
+from locking import FileLock
+
+# One append-only file per note. Each record is a fixed header followed by a
+# zlib-compressed JSON payload:
+#   FULL:  {"title": ..., "content": ...}
+#   DELTA: {"title": new title or null if unchanged, "content": line ops}
+# Content deltas are taken against the previous revision. Every
+# `snapshot_every`-th revision is FULL, so rebuilding any revision decompresses
+# at most that many records.
+RECORD = struct.Struct(">IdBI")     # rev, saved_at, kind, payload length
+FULL, DELTA = 0, 1
+
+
+def make_delta(old, new):
+    """Line ops turning old into new: n > 0 keeps n lines, n < 0 drops -n lines,
+    a list of strings inserts those lines."""
+    a, b = old.splitlines(keepends=True), new.splitlines(keepends=True)
+    ops = []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if tag == "equal":
+            ops.append(i2 - i1)
+            continue
+        if i2 > i1:
+            ops.append(i1 - i2)
+        if j2 > j1:
+            ops.append(b[j1:j2])
+    return ops
+
+
+def apply_delta(old, ops):
+    lines = old.splitlines(keepends=True)
+    out, i = [], 0
+    for op in ops:
+        if isinstance(op, list):
+            out.extend(op)
+        elif op > 0:
+            out.extend(lines[i:i + op])
+            i += op
+        else:
+            i -= op
+    return "".join(out)
+
+
+# ---------------- Note revision history ----------------
+
+class NoteHistory:
+    """Earlier versions of each note, stored as compressed deltas.
+
+    record() is called with the note as it was before an update. The note
+    itself always holds the current version, so history only keeps the past.
+    """
+
+    def __init__(self, directory, snapshot_every=8):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self._lock = FileLock(directory + ".lock")
+
+    def _path(self, note_id):
+        return os.path.join(self.directory, f"{int(note_id)}.hist")
+
+    def _records(self, note_id):
+        """[(rev, saved_at, kind, payload bytes)] oldest first; a torn tail is ignored."""
+        try:
+            with open(self._path(note_id), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        records, offset = [], 0
+        while offset + RECORD.size <= len(data):
+            rev, saved_at, kind, length = RECORD.unpack_from(data, offset)
+            start = offset + RECORD.size
+            if start + length > len(data):
+                break
+            records.append((rev, saved_at, kind, data[start:start + length]))
+            offset = start + length
+        return records
+
+    @staticmethod
+    def _rebuild(records, index):
+        """Title and content of records[index], starting from the nearest FULL record before it."""
+        start = index
+        while records[start][2] != FULL:
+            start -= 1
+        version = json.loads(zlib.decompress(records[start][3]))
+        for _, _, _, payload in records[start + 1:index + 1]:
+            delta = json.loads(zlib.decompress(payload))
+            if delta["title"] is not None:
+                version["title"] = delta["title"]
+            version["content"] = apply_delta(version["content"], delta["content"])
+        return version
+
+    def record(self, note, min_interval=0):
+        """Append note's title/content as the next revision.
+
+        Skipped if it equals the latest revision, or if that one is younger
+        than min_interval seconds (so autosave doesn't store every keystroke).
+        """
+        now = time.time()
+        with self._lock:
+            records = self._records(note["id"])
+            if records:
+                last = self._rebuild(records, len(records) - 1)
+                if (last["title"], last["content"]) == (note["title"], note["content"]):
+                    return False
+                if now - records[-1][1] < min_interval:
+                    return False
+            rev = records[-1][0] + 1 if records else 1
+            if not records or (rev - 1) % self.snapshot_every == 0:
+                kind, body = FULL, {"title": note["title"], "content": note["content"]}
+            else:
+                kind = DELTA
+                body = {"title": note["title"] if note["title"] != last["title"] else None,
+                        "content": make_delta(last["content"], note["content"])}
+            payload = zlib.compress(json.dumps(body, separators=(",", ":")).encode("utf-8"))
+            end = sum(RECORD.size + len(r[3]) for r in records)
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._path(note["id"]), "ab") as f:
+                f.truncate(end)   # drop a record torn by a crash
+                f.write(RECORD.pack(rev, now, kind, len(payload)) + payload)
+            return True
+
+    def revisions(self, note_id):
+        """[(rev, saved_at)] newest first."""
+        return [(rev, saved_at) for rev, saved_at, _, _ in reversed(self._records(note_id))]
+
+    def get(self, note_id, rev):
+        """{"rev", "saved_at", "title", "content"} for one revision, or None."""
+        records = self._records(note_id)
+        for index, (r, saved_at, _, _) in enumerate(records):
+            if r == rev:
+                return dict(self._rebuild(records, index), rev=rev, saved_at=saved_at)
+        return None
+
+    def delete(self, note_ids):
+        for note_id in note_ids:
+            try:
+                os.remove(self._path(note_id))
+            except FileNotFoundError:
+                pass
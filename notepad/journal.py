@@ -0,0 +1,61 @@
+import json
+import os
+
+
+# ---------------- Append-only note journal ----------------
+
+class NoteJournal:
+    """Write-ahead log of note mutations, one compact JSON record per line.
+
+    Records are replayed on top of the last snapshot at startup. A record is
+    only considered written once its trailing newline is on disk, so a line
+    torn by a crash is ignored on replay, and cut off by the next append so
+    it cannot swallow the records written after it.
+    """
+
+    def __init__(self, path, fsync=False):
+        self.path = path
+        self.fsync = fsync
+        self.count = 0   # records appended since the last checkpoint
+        self.valid_size = None   # bytes of complete records, known once replay() ran
+
+    def append(self, record):
+        self.append_many([record])
+
+    def append_many(self, records):
+        """Append several records with a single write."""
+        lines = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records).encode("utf-8")
+        with open(self.path, "ab") as f:
+            if self.valid_size is not None and f.tell() > self.valid_size:
+                f.truncate(self.valid_size)   # drop a record torn by a crash
+            f.write(lines)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self.count += len(records)
+        if self.valid_size is not None:
+            self.valid_size += len(lines)
+
+    def replay(self):
+        """Yield every complete record in the journal, oldest first."""
+        self.count = 0
+        self.valid_size = 0
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break   # torn write from a crash
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                self.count += 1
+                self.valid_size += len(line)
+                yield record
+
+    def truncate(self):
+        with open(self.path, "w"):
+            pass
+        self.count = 0
+        self.valid_size = 0
@@ -0,0 +1,129 @@
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:   # Windows
+    fcntl = None
+    import msvcrt
+
+
+# ---------------- Atomic writes ----------------
+
+# Name prefix of atomic_write's temp files, so directory scans can skip them
+TEMP_PREFIX = ".tmp-"
+
+
+def atomic_write(path, write, mode="w"):
+    """Call write(f) on a temp file next to `path`, then rename it over `path`.
+
+    Readers see either the old file or the new one, never a half-written one.
+    Returns the new file's file_signature().
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=TEMP_PREFIX, suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, mode) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+            # A rename keeps inode, size and mtime, so this is the signature
+            # of `path` itself, taken before any other writer can replace it
+            st = os.fstat(f.fileno())
+        os.replace(tmp_path, path)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def file_signature(path):
+    """Cheap change detector: (mtime_ns, size, inode), or None if missing."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+# ---------------- Cross-process lock ----------------
+
+class FileLock:
+    """Exclusive advisory lock on `path`, shared by every worker process.
+
+    Each thread opens its own descriptor, so threads of one process also
+    exclude each other. Not reentrant.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def __enter__(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._local.fd = fd
+        return self
+
+    def __exit__(self, *exc):
+        fd = self._local.fd
+        del self._local.fd
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+
+# ---------------- In-process reader/writer lock ----------------
+
+class RWLock:
+    """Many concurrent readers or one writer; waiting writers block new readers."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
@@ -0,0 +1,100 @@
+import logging
+import os
+import threading
+import time
+
+from utils import BASE_DIR, get_store, load_users, permanently_delete_notes, store_options
+
+DATA_DIR = os.path.join(BASE_DIR, "data")
+DAY = 24 * 60 * 60
+
+
+def data_size():
+    """Bytes used by data/ (and the SQLite files, if they live elsewhere)."""
+    paths = []
+    for root, _, files in os.walk(DATA_DIR):
+        paths.extend(os.path.join(root, name) for name in files if not name.endswith(".lock"))
+    sqlite_path = os.path.abspath(store_options()["sqlite_path"])
+    if not sqlite_path.startswith(DATA_DIR + os.sep):
+        paths.extend(sqlite_path + suffix for suffix in ("", "-wal", "-shm"))
+    return sum(os.path.getsize(p) for p in paths if os.path.exists(p))
+
+
+# ---------------- Retention / compaction ----------------
+
+def compact_notes(retention_days=30, purge_orphans=False):
+    """Delete archived notes not touched for retention_days (None keeps them all),
+    then have the store rewrite itself. Returns a report dict.
+
+    Notes whose owner has no account are only counted unless purge_orphans is
+    set, and never deleted while no users load at all: an unreadable
+    users.json must not look like every account was removed.
+    """
+    started = time.perf_counter()
+    before = data_size()
+    owners = {u["email"].strip().lower() for u in load_users() if u.get("email")}
+    purge_orphans = purge_orphans and bool(owners)
+    cutoff = None if retention_days is None else time.time() - retention_days * DAY
+
+    expired = orphaned = 0
+    doomed = {}   # owner -> [note_id, ...]
+    for note in get_store().all():
+        if note["owner"].strip().lower() not in owners:
+            orphaned += 1
+            if not purge_orphans:
+                continue
+        elif note["status"] == "archived" and cutoff is not None and note["updated_at"] < cutoff:
+            expired += 1
+        else:
+            continue
+        doomed.setdefault(note["owner"], []).append(note["id"])
+    for owner, note_ids in doomed.items():
+        permanently_delete_notes(owner, note_ids)   # history goes too
+
+    get_store().compact()
+    after = data_size()
+    return {
+        "expired": expired,
+        "orphaned": orphaned,
+        "orphans_purged": orphaned if purge_orphans else 0,
+        "bytes_before": before,
+        "bytes_after": after,
+        "bytes_reclaimed": before - after,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def format_report(report):
+    return ("Purged {expired} expired archived note(s) and {orphans_purged} of {orphaned} "
+            "orphaned note(s); {bytes_before} -> {bytes_after} bytes ({bytes_reclaimed} reclaimed) "
+            "in {seconds:.2f}s").format(**report)
+
+
+class CompactScheduler:
+    """Runs compact_notes() every `interval` seconds on a daemon thread.
+
+    Every worker process that starts one runs its own, so enable it in one
+    worker only (or use the `flask notes-compact` command from cron). It
+    never purges orphaned notes; that takes `flask notes-compact --purge-orphans`.
+    """
+
+    def __init__(self, interval, retention_days=30):
+        self.interval = interval
+        self.retention_days = retention_days
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="notes-compact", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        log = logging.getLogger(__name__)
+        while not self._stop.wait(self.interval):
+            try:
+                log.info(format_report(compact_notes(self.retention_days)))
+            except Exception:
+                log.exception("Scheduled notes compaction failed")
@@ -0,0 +1,46 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from instrumentation.metrics import RequestMetrics, init_metrics
+
+
+def ratio(hits, misses):
+    return hits / (hits + misses) if hits + misses else 0.0
+
+
+# ---------------- Notepad gauges ----------------
+
+def notepad_metrics():
+    """RequestMetrics with the store caches, SQLite connections and hashing pool added."""
+    import utils
+    from fragment_cache import get_fragment_cache
+    from hashing import get_hashing_pool
+
+    metrics = RequestMetrics("notepad")
+
+    def caches():
+        fragments = get_fragment_cache()
+        return {"fragment": (fragments.hits, fragments.misses)}
+
+    metrics.gauge("store_cache_hits_total", "Store cache hits.",
+                  lambda: {name: hits for name, (hits, _) in caches().items()}, label="cache", kind="counter")
+    metrics.gauge("store_cache_misses_total", "Store cache misses.",
+                  lambda: {name: misses for name, (_, misses) in caches().items()}, label="cache", kind="counter")
+    metrics.gauge("store_cache_hit_ratio", "Store cache hits / lookups since start.",
+                  lambda: {name: f"{ratio(*counts):.4f}" for name, counts in caches().items()}, label="cache")
+    metrics.gauge("fragment_cache_bytes", "Bytes of rendered fragments cached.",
+                  lambda: get_fragment_cache().size)
+
+    def sqlite_connections():
+        database = getattr(utils.get_store(), "database", None)
+        return database.connections if database is not None else 0
+
+    metrics.gauge("sqlite_connections", "SQLite connections opened (one per thread; 0 unless the sqlite backend is used).",
+                  sqlite_connections)
+    metrics.gauge("hashing_pool_workers", "Password hashing worker processes.",
+                  lambda: get_hashing_pool().workers)
+    metrics.gauge("hashing_pool_jobs", "Password hashing jobs running or queued.",
+                  lambda: get_hashing_pool().in_use())
+    metrics.gauge("hashing_pool_capacity", "Password hashing jobs admitted before answering 503.",
+                  lambda: get_hashing_pool().capacity())
+    return metrics
@@ -0,0 +1,160 @@
+"""One-shot migration of data/users.json and the notes into SQLite.
+
+Usage (from the notepad/ folder):
+    python migrate.py [path/to/notepad.db]
+
+Notes are read through the store the app uses, so un-checkpointed journal
+records, the archived-notes cold tier, per-owner shards and notes.mmap are
+all included. NOTES_BACKEND picks the store as for the app; when it is unset
+(or "sqlite") the backend is detected from the files in data/, and the
+journal and cold tier are read whenever their files exist.
+"""
+import json
+import os
+import sqlite3
+import sys
+
+from records import is_records_file, iter_records
+from sqlite_store import SqliteDatabase, USER_FIELDS, NOTE_FIELDS
+from utils import (USERS_FILE, SQLITE_FILE, NOTES_ARCHIVE_FILE, NOTES_JOURNAL_FILE, NOTES_MMAP_FILE,
+                   NOTES_SHARD_DIR, configure_store, get_store)
+
+CHUNK_SIZE = 64 * 1024
+BATCH_SIZE = 1000
+
+
+def iter_json_array(path, key=None):
+    """Yield the elements of a top-level JSON array (or the array under `key`)
+    one at a time, reading the file in chunks instead of parsing it whole."""
+    decoder = json.JSONDecoder()
+    with open(path, "r") as f:
+        buf = ""
+        eof = False
+
+        def fill():
+            nonlocal buf, eof
+            chunk = f.read(CHUNK_SIZE)
+            if chunk:
+                buf += chunk
+            else:
+                eof = True
+
+        # Find the opening bracket of the array we want
+        marker = '"%s"' % key if key else None
+        while True:
+            if marker and marker in buf:
+                buf = buf[buf.index(marker) + len(marker):]
+                marker = None
+            if not marker and "[" in buf:
+                buf = buf[buf.index("[") + 1:]
+                break
+            if eof:
+                return
+            fill()
+
+        pos = 0
+        while True:
+            # Skip separators between elements
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n,":
+                    pos += 1
+                if pos < len(buf) or eof:
+                    break
+                fill()
+            if pos >= len(buf) or buf[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                buf = buf[pos:]
+                pos = 0
+                fill()
+                continue
+            yield item
+            pos = end
+            if pos > CHUNK_SIZE:
+                buf = buf[pos:]
+                pos = 0
+
+
+def iter_items(path, key=None):
+    """Like iter_json_array, but also reads files saved in the "records" format."""
+    with open(path, "rb") as f:
+        records = is_records_file(f)
+    if not records:
+        yield from iter_json_array(path, key)
+        return
+    with open(path, "rb") as f:
+        items = iter_records(f)
+        next(items, None)   # header
+        yield from items
+
+
+def _batches(items):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def source_store():
+    """The note store holding the data to migrate (see the module docstring)."""
+    backend = os.environ.get("NOTES_BACKEND", "sqlite")
+    if backend == "sqlite":
+        if os.path.exists(NOTES_MMAP_FILE):
+            backend = "mmap"
+        elif os.path.isdir(NOTES_SHARD_DIR):
+            backend = "sharded"
+        else:
+            backend = "json"
+    journal = os.environ.get("NOTES_JOURNAL") == "1" or (
+        os.path.exists(NOTES_JOURNAL_FILE) and os.path.getsize(NOTES_JOURNAL_FILE) > 0)
+    cold_tier = os.environ.get("NOTES_COLD_TIER") == "1" or os.path.exists(NOTES_ARCHIVE_FILE)
+    if backend != "json":
+        # Only the json backend has these; the others imported them on first start
+        journal = cold_tier = False
+    configure_store(backend=backend, journal=journal, cold_tier=cold_tier)
+    return get_store()
+
+
+def migrate_json_to_sqlite(db_path=SQLITE_FILE, users_path=USERS_FILE, notes=None):
+    """Copy users and notes into the SQLite database at db_path.
+
+    `notes` is the note store to copy from (by default source_store()).
+    Users clashing with an existing email, username or contact are skipped.
+    Returns (users_copied, users_skipped, notes_copied).
+    """
+    db = SqliteDatabase(db_path).connect()
+    users_copied = users_skipped = notes_copied = 0
+    if notes is None:
+        notes = source_store()
+
+    user_sql = f"INSERT INTO users ({', '.join(USER_FIELDS)}) VALUES ({', '.join('?' * len(USER_FIELDS))})"
+    for batch in _batches(iter_items(users_path) if os.path.exists(users_path) else ()):
+        with db:
+            for user in batch:
+                try:
+                    db.execute(user_sql, [user.get(f) for f in USER_FIELDS])
+                    users_copied += 1
+                except sqlite3.IntegrityError:
+                    users_skipped += 1
+
+    note_sql = f"INSERT OR REPLACE INTO notes ({', '.join(NOTE_FIELDS)}) VALUES ({', '.join('?' * len(NOTE_FIELDS))})"
+    for batch in _batches(notes.all()):
+        with db:
+            db.executemany(note_sql, ([n.get(f) for f in NOTE_FIELDS] for n in batch))
+        notes_copied += len(batch)
+
+    return users_copied, users_skipped, notes_copied
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else SQLITE_FILE
+    copied, skipped, notes = migrate_json_to_sqlite(target)
+    print(f"Migrated {copied} users ({skipped} skipped as duplicates) and {notes} notes into {target}")
@@ -0,0 +1,377 @@
+import json
+import mmap
+import os
+import struct
+import time
+import zlib
+from bisect import bisect_left, insort
+from contextlib import contextmanager
+
+from locking import FileLock, RWLock, atomic_write, file_signature
+from search import note_tokens, tokenize
+from store import STATUSES, NoteConflict, format_version, note_digest
+
+# File layout: a fixed file header, then one record per note version:
+#   record header: id, payload length, live flag, status, updated_at, owner hash
+#   payload:       compact JSON {"id", "owner", "title", "content"}
+# status and updated_at live only in the header, so archiving, restoring and
+# touching a note patch 9 bytes in place. Edits append a new version and then
+# clear the old one's live flag; if a crash comes in between, the later copy
+# wins when the file is scanned.
+MAGIC = b"NPMMAP1\n"
+FILE_HEADER = struct.Struct(">8sQQ")        # magic, generation, next_id
+RECORD_HEADER = struct.Struct(">IIBBdI")    # id, length, live, status, updated_at, owner_hash
+GENERATION_AT = 8
+LIVE_AT = 8                                 # offsets inside a record header
+STATE_AT = 9
+STATE = struct.Struct(">Bd")                # status, updated_at
+PAYLOAD_FIELDS = ("id", "owner", "title", "content")
+
+
+def owner_hash(owner):
+    return zlib.crc32(owner.strip().lower().encode("utf-8"))
+
+
+def _record(note):
+    payload = json.dumps({f: note[f] for f in PAYLOAD_FIELDS}, separators=(",", ":")).encode("utf-8")
+    header = RECORD_HEADER.pack(note["id"], len(payload), 1, STATUSES.index(note["status"]),
+                                note["updated_at"], owner_hash(note["owner"]))
+    return header + payload
+
+
+# ---------------- Memory-mapped note store ----------------
+
+class MmapNoteStore:
+    """Notes in one record file, read through mmap.
+
+    Opening the store scans only the fixed-size record headers to build
+    id -> (offset, length), so reading or patching one note never parses
+    the others. Listing an owner's notes parses just that owner's payloads.
+
+    Writers hold the same cross-process FileLock as NoteStore. Every write
+    bumps the generation number in the file header, which readers in other
+    processes compare (with the file's size and inode) to know when to rescan.
+    Superseded versions stay in the file until compact(), which also runs by
+    itself once dead records outweigh live ones.
+    """
+
+    def __init__(self, path, legacy=None, compact_after=1 << 20):
+        self.path = path
+        self.compact_after = compact_after
+        self._rwlock = RWLock()
+        self._file_lock = FileLock(path + ".lock")
+        self._file = None
+        self._mm = None
+        self._signature = None
+        self._generation = None
+        self.index = {}         # note_id -> (offset, length)
+        self.meta = {}          # note_id -> (owner_hash, status index, updated_at)
+        self.by_owner = {}      # owner_hash -> {note_id, ...}
+        self.sorted_keys = {}   # (owner_hash, status index) -> [(updated_at, note_id), ...] ascending
+        self.digests = {}       # owner_hash -> XOR of note_digest() over their notes
+        self.next_id = 1
+        self._end = FILE_HEADER.size
+        self._dead = 0          # bytes held by superseded or deleted records
+        if not os.path.exists(path):
+            self._create(legacy)
+
+    def _create(self, legacy):
+        """First start: write the record file, importing the notes of the `legacy` store."""
+        with self._file_lock:
+            if os.path.exists(self.path):
+                return
+            notes = legacy.all() if legacy is not None else []
+            next_id = max(getattr(legacy, "next_id", 1), max((n["id"] for n in notes), default=0) + 1)
+            self._write_file(notes, next_id)
+
+    def _write_file(self, notes, next_id):
+        def write(f):
+            f.write(FILE_HEADER.pack(MAGIC, 0, next_id))
+            for note in notes:
+                f.write(_record(note))
+        atomic_write(self.path, write, mode="wb")
+
+    # ----- loading / indexing -----
+    def _is_stale(self):
+        if self._mm is None:
+            return True
+        signature = file_signature(self.path)
+        if signature is None or signature[1:] != self._signature[1:]:
+            return True   # grown by another process, or replaced by compact()
+        return FILE_HEADER.unpack_from(self._mm, 0)[1] != self._generation
+
+    def _map(self):
+        self._close()
+        self._file = open(self.path, "r+b")
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        st = os.fstat(self._file.fileno())
+        self._signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._file.close()
+            self._mm = self._file = None
+
+    def _reload(self):
+        self._map()
+        mm = self._mm
+        magic, self._generation, self.next_id = FILE_HEADER.unpack_from(mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a notepad mmap store")
+        self.index, self.meta, self.by_owner, self.sorted_keys, self.digests = {}, {}, {}, {}, {}
+        self._dead = 0
+        offset, size = FILE_HEADER.size, len(mm)
+        while offset + RECORD_HEADER.size <= size:
+            note_id, length, live, status, updated_at, owner = RECORD_HEADER.unpack_from(mm, offset)
+            end = offset + RECORD_HEADER.size + length
+            if end > size or live > 1 or status >= len(STATUSES):
+                break   # torn append from a crash; the next append overwrites it
+            if live:
+                self._index(note_id, offset, length, owner, status, updated_at)
+            else:
+                self._dead += end - offset
+            offset = end
+        self._end = offset
+
+    def _index(self, note_id, offset, length, owner, status, updated_at):
+        if note_id in self.index:
+            self._unindex(note_id)
+        self.index[note_id] = (offset, length)
+        self.meta[note_id] = (owner, status, updated_at)
+        self.by_owner.setdefault(owner, set()).add(note_id)
+        insort(self.sorted_keys.setdefault((owner, status), []), (updated_at, note_id))
+        self._toggle_digest(owner, note_id, status, updated_at)
+
+    def _unindex(self, note_id):
+        offset, length = self.index.pop(note_id)
+        owner, status, updated_at = self.meta.pop(note_id)
+        self.by_owner[owner].discard(note_id)
+        self._drop_key(owner, status, updated_at, note_id)
+        self._toggle_digest(owner, note_id, status, updated_at)
+        self._dead += RECORD_HEADER.size + length
+        return offset
+
+    def _toggle_digest(self, owner, note_id, status, updated_at):
+        digest = self.digests.get(owner, 0) ^ note_digest(note_id, updated_at, STATUSES[status])
+        if digest:
+            self.digests[owner] = digest
+        else:
+            self.digests.pop(owner, None)
+
+    def _drop_key(self, owner, status, updated_at, note_id):
+        keys = self.sorted_keys[(owner, status)]
+        del keys[bisect_left(keys, (updated_at, note_id))]
+
+    @contextmanager
+    def _reading(self):
+        # The stale check reads self._mm, which a writer may be remapping, so
+        # it runs under the read lock too; reload under the write lock and retry.
+        while True:
+            with self._rwlock.read():
+                if not self._is_stale():
+                    yield
+                    return
+            with self._rwlock.write():
+                if self._is_stale():
+                    self._reload()
+
+    @contextmanager
+    def _writing(self):
+        with self._rwlock.write(), self._file_lock:
+            if self._is_stale():
+                self._reload()
+            yield
+            self._generation += 1
+            struct.pack_into(">QQ", self._mm, GENERATION_AT, self._generation, self.next_id)
+            self._mm.flush()
+            if self._dead > self.compact_after and self._dead > self._end - self._dead:
+                self._compact()
+
+    # ----- record access -----
+    def _read(self, note_id):
+        offset, length = self.index[note_id]
+        start = offset + RECORD_HEADER.size
+        note = json.loads(self._mm[start:start + length])
+        _, status, updated_at = self.meta[note_id]
+        note["status"] = STATUSES[status]
+        note["updated_at"] = updated_at
+        return note
+
+    def _get(self, owner, note_id):
+        if note_id not in self.index:
+            return None
+        note = self._read(note_id)
+        return note if note["owner"] == owner else None
+
+    def _owned(self, owner):
+        notes = (self._read(note_id) for note_id in self.by_owner.get(owner_hash(owner), ()))
+        return [n for n in notes if n["owner"] == owner]
+
+    def _append(self, notes):
+        """Write new versions of notes at the end of the file, then retire the old ones."""
+        if not notes:
+            return
+        data = [_record(n) for n in notes]
+        self._file.seek(self._end)
+        self._file.write(b"".join(data))
+        self._file.flush()
+        old = [self._unindex(n["id"]) for n in notes if n["id"] in self.index]
+        offset = self._end
+        for note, record in zip(notes, data):
+            self._index(note["id"], offset, len(record) - RECORD_HEADER.size,
+                        owner_hash(note["owner"]), STATUSES.index(note["status"]), note["updated_at"])
+            offset += len(record)
+        self._end = offset
+        self._map()
+        for old_offset in old:
+            self._mm[old_offset + LIVE_AT] = 0
+
+    def _patch_state(self, note_id, status, updated_at):
+        """Change status/updated_at in the record header, in place."""
+        offset, _ = self.index[note_id]
+        owner, old_status, old_updated_at = self.meta[note_id]
+        STATE.pack_into(self._mm, offset + STATE_AT, status, updated_at)
+        self.meta[note_id] = (owner, status, updated_at)
+        self._drop_key(owner, old_status, old_updated_at, note_id)
+        insort(self.sorted_keys.setdefault((owner, status), []), (updated_at, note_id))
+        self._toggle_digest(owner, note_id, old_status, old_updated_at)
+        self._toggle_digest(owner, note_id, status, updated_at)
+
+    def _kill(self, note_id):
+        self._mm[self._unindex(note_id) + LIVE_AT] = 0
+
+    def _compact(self):
+        before = self._end
+        notes = [self._read(note_id) for note_id in sorted(self.index)]
+        self._close()   # Windows cannot replace a mapped file
+        self._write_file(notes, self.next_id)
+        self._reload()
+        return before - self._end
+
+    def compact(self):
+        """Rewrite the file with live records only; returns the bytes reclaimed."""
+        with self._rwlock.write(), self._file_lock:
+            self._reload()
+            return self._compact()
+
+    # ----- reads -----
+    def all(self, owner=None):
+        with self._reading():
+            if owner is not None:
+                return self._owned(owner)
+            return [self._read(note_id) for note_id in sorted(self.index)]
+
+    def get(self, owner, note_id):
+        with self._reading():
+            return self._get(owner, note_id)
+
+    def version(self, owner):
+        """Digest over the headers of owner's notes (see store.note_digest), kept
+        up to date as records are indexed; parses nothing."""
+        with self._reading():
+            return format_version(self.digests.get(owner_hash(owner), 0))
+
+    def list(self, owner, status):
+        return self.page(owner, status)[0]
+
+    def page(self, owner, status, limit=None, before=None):
+        """Same contract as NoteStore.page; only the returned notes are parsed."""
+        with self._reading():
+            keys = self.sorted_keys.get((owner_hash(owner), STATUSES.index(status)), [])
+            end = bisect_left(keys, tuple(before)) if before else len(keys)
+            notes, last = [], None
+            while end and (limit is None or len(notes) < limit):
+                end -= 1
+                note = self._read(keys[end][1])
+                if note["owner"] == owner:
+                    notes.append(note)
+                    last = keys[end]
+            return notes, (last if end else None)
+
+    def search(self, owner, query, status=None):
+        terms = tokenize(query)
+        with self._reading():
+            if not terms:
+                return []
+            return [n for n in self._owned(owner)
+                    if terms <= note_tokens(n) and (status is None or n["status"] == status)]
+
+    # ----- writes -----
+    def replace_all(self, notes, owner=None):
+        if owner is None:
+            with self._rwlock.write(), self._file_lock:
+                self._reload()
+                notes = [dict(n) for n in notes]
+                next_id = max(self.next_id, max((n["id"] for n in notes), default=0) + 1)
+                self._close()
+                self._write_file(notes, next_id)
+                self._reload()
+            return
+        with self._writing():
+            for n in self._owned(owner):
+                self._kill(n["id"])
+            self._append([dict(n) for n in notes])
+
+    def add(self, owner, title, content):
+        with self._writing():
+            note = {"id": self.next_id, "owner": owner, "title": title, "content": content,
+                    "status": "active", "updated_at": time.time()}
+            self.next_id += 1
+            self._append([note])
+            return note
+
+    def add_many(self, owner, notes):
+        with self._writing():
+            added = []
+            for n in notes:
+                added.append(dict(n, id=self.next_id, owner=owner))
+                self.next_id += 1
+            self._append(added)
+            return added
+
+    def update(self, owner, note_id, if_updated_at=None, **fields):
+        with self._writing():
+            note = self._get(owner, note_id)
+            if note is None:
+                return None
+            if if_updated_at is not None and note["updated_at"] != if_updated_at:
+                raise NoteConflict(note)
+            note.update(fields, updated_at=time.time())
+            self._save_fields([note], fields)
+            return note
+
+    def update_many(self, owner, note_ids, **fields):
+        with self._writing():
+            now = time.time()
+            notes = [n for n in (self._get(owner, i) for i in set(note_ids)) if n is not None]
+            for note in notes:
+                note.update(fields, updated_at=now)
+            self._save_fields(notes, fields)
+            return len(notes)
+
+    def _save_fields(self, notes, fields):
+        if set(fields) <= {"status"}:
+            for note in notes:
+                self._patch_state(note["id"], STATUSES.index(note["status"]), note["updated_at"])
+        else:
+            self._append(notes)
+
+    def delete(self, owner, note_id):
+        return self.delete_many(owner, [note_id]) > 0
+
+    def delete_many(self, owner, note_ids):
+        with self._writing():
+            ids = [i for i in set(note_ids) if self._get(owner, i) is not None]
+            for note_id in ids:
+                self._kill(note_id)
+            return len(ids)
+
+    def rename_owner(self, old_email, new_email):
+        """Move every note whose owner matches old_email (case-insensitive) to new_email."""
+        with self._writing():
+            old = old_email.strip().lower()
+            notes = [self._read(i) for i in self.by_owner.get(owner_hash(old_email), ())]
+            notes = [dict(n, owner=new_email) for n in notes if n["owner"].strip().lower() == old]
+            self._append(notes)
+            return bool(notes)
@@ -0,0 +1,23 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from instrumentation.profiling import init_profiling, timed
+
+
+class TimedProxy:
+    """Forwards to `target`, timing every method call as `stage`."""
+
+    def __init__(self, target, stage):
+        self._target = target
+        self._stage = stage
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+        stage = self._stage
+
+        def call(*args, **kwargs):
+            with timed(stage):
+                return attr(*args, **kwargs)
+        return call
@@ -0,0 +1,70 @@
+import json
+import struct
+
+# File layout: MAGIC, then records of a 4-byte big-endian length followed by
+# that many bytes of compact UTF-8 JSON. The first record is a header holding
+# the document's scalar fields and the name of its list ("items": null for a
+# bare list); every following record is one element of that list.
+MAGIC = b"NPREC1\n"
+LENGTH = struct.Struct(">I")
+
+
+def _dumps(value):
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def write_records(f, data):
+    """Write `data` (a list, or a dict with one list value such as notes.json) to binary file f."""
+    if isinstance(data, dict):
+        key = next((k for k, v in data.items() if isinstance(v, list)), None)
+        header = {"fields": {k: v for k, v in data.items() if k != key}, "items": key}
+        items = data[key] if key is not None else []
+    else:
+        header = {"fields": None, "items": None}
+        items = data
+    f.write(MAGIC)
+    for value in [header, *items]:
+        payload = _dumps(value)
+        f.write(LENGTH.pack(len(payload)))
+        f.write(payload)
+
+
+def is_records_file(f):
+    """True if binary file f starts with MAGIC. Leaves f at the start."""
+    found = f.read(len(MAGIC)) == MAGIC
+    f.seek(0)
+    return found
+
+
+def iter_records(f):
+    """Yield the header and then each item of an open records file, one at a time.
+
+    Only one record is held in memory at once. A record cut short by a crash
+    ends the iteration.
+    """
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError("not a notepad records file")
+    while True:
+        prefix = f.read(LENGTH.size)
+        if len(prefix) < LENGTH.size:
+            return
+        (size,) = LENGTH.unpack(prefix)
+        payload = f.read(size)
+        if len(payload) < size:
+            return
+        yield json.loads(payload)
+
+
+def read_records(f):
+    """Rebuild the document written by write_records()."""
+    records = iter_records(f)
+    header = next(records, None)
+    if header is None:
+        return []
+    items = list(records)
+    if header["fields"] is None:
+        return items
+    data = dict(header["fields"])
+    if header["items"] is not None:
+        data[header["items"]] = items
+    return data
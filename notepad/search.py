@@ -0,0 +1,98 @@
+import re
+import threading
+
+# Letters and digits; everything else (including "_") separates tokens,
+# matching SQLite's unicode61 tokenizer used by the SQLite backend.
+TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def tokenize(text):
+    return set(TOKEN_RE.findall(text.lower()))
+
+
+def note_tokens(note):
+    return tokenize(note["title"]) | tokenize(note["content"])
+
+
+# ---------------- Inverted index ----------------
+
+class SearchIndex:
+    """token -> set of note ids, kept separately for each owner.
+
+    An owner's postings are built from their notes on their first search and
+    then maintained incrementally by add()/discard() as notes change. Owners
+    who never search cost nothing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.postings = {}   # owner -> {token: {note_id, ...}}
+        self.tokens = {}     # note_id -> (owner, tokens), to undo a note's postings
+
+    def clear(self):
+        with self._lock:
+            self.postings = {}
+            self.tokens = {}
+
+    def is_built(self, owner):
+        return owner in self.postings
+
+    def build(self, owner, notes):
+        # Runs under the store's read lock, next to other searches: fill
+        # private dicts and publish them only once they are complete
+        postings, tokens = {}, {}
+        for note in notes:
+            tokens[note["id"]] = (owner, note_tokens(note))
+            for token in tokens[note["id"]][1]:
+                postings.setdefault(token, set()).add(note["id"])
+        with self._lock:
+            if owner not in self.postings:
+                self.tokens.update(tokens)
+                self.postings[owner] = postings
+
+    def add(self, note):
+        if note["owner"] in self.postings:
+            with self._lock:
+                self._add(note)
+
+    def discard(self, note):
+        with self._lock:
+            self._discard(note["id"])
+
+    def _add(self, note):
+        self._discard(note["id"])
+        owner_postings = self.postings[note["owner"]]
+        tokens = note_tokens(note)
+        for token in tokens:
+            owner_postings.setdefault(token, set()).add(note["id"])
+        self.tokens[note["id"]] = (note["owner"], tokens)
+
+    def _discard(self, note_id):
+        entry = self.tokens.pop(note_id, None)
+        if entry is None:
+            return
+        owner, tokens = entry
+        owner_postings = self.postings.get(owner)
+        if owner_postings is None:
+            return
+        for token in tokens:
+            ids = owner_postings.get(token)
+            if ids is not None:
+                ids.discard(note_id)
+                if not ids:
+                    del owner_postings[token]
+
+    def search(self, owner, query):
+        """Ids of owner's notes containing every token of `query`."""
+        terms = tokenize(query)
+        owner_postings = self.postings.get(owner, {})
+        if not terms:
+            return set()
+        # Intersect starting from the rarest term so the work stays small
+        lists = sorted((owner_postings.get(t, set()) for t in terms), key=len)
+        result = set(lists[0])
+        for ids in lists[1:]:
+            result &= ids
+            if not result:
+                break
+        return result
@@ -0,0 +1,326 @@
+import sqlite3
+import threading
+import time
+
+from search import tokenize
+from store import NoteConflict, format_version
+
+
+USER_FIELDS = ("email", "username", "password", "firstname", "middlename", "lastname",
+               "province", "city", "barangay", "zip_code", "contact", "birthday", "age")
+NOTE_FIELDS = ("id", "owner", "title", "content", "status", "updated_at")
+
+# AUTOINCREMENT: ids are never reused, even the highest one after a delete,
+# so a new note can't inherit a deleted note's revision history
+NOTES_TABLE = """CREATE TABLE IF NOT EXISTS {name} (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    owner      TEXT NOT NULL,
+    title      TEXT NOT NULL,
+    content    TEXT NOT NULL DEFAULT '',
+    status     TEXT NOT NULL DEFAULT 'active',
+    updated_at REAL NOT NULL
+)"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id         INTEGER PRIMARY KEY,
+    email      TEXT NOT NULL,
+    username   TEXT NOT NULL,
+    password   TEXT NOT NULL,
+    firstname  TEXT,
+    middlename TEXT,
+    lastname   TEXT,
+    province   TEXT,
+    city       TEXT,
+    barangay   TEXT,
+    zip_code   TEXT,
+    contact    TEXT,
+    birthday   TEXT,
+    age        TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS users_email ON users (email);
+CREATE UNIQUE INDEX IF NOT EXISTS users_username ON users (username);
+CREATE UNIQUE INDEX IF NOT EXISTS users_contact ON users (contact);
+
+%s;
+CREATE INDEX IF NOT EXISTS notes_owner_status ON notes (owner, status, updated_at);
+-- Same expression rename_owner matches on, so email changes use an index
+CREATE INDEX IF NOT EXISTS notes_owner_normalized ON notes (lower(trim(owner)));
+
+-- Full-text index over title/content, kept in step with notes by triggers
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5 (
+    title, content, content='notes', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS notes_fts_insert AFTER INSERT ON notes BEGIN
+    INSERT INTO notes_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_fts_delete AFTER DELETE ON notes BEGIN
+    INSERT INTO notes_fts (notes_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_fts_update AFTER UPDATE OF title, content ON notes BEGIN
+    INSERT INTO notes_fts (notes_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+    INSERT INTO notes_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+END;
+
+-- Per-owner change counter behind SqliteNoteStore.version, bumped by triggers
+-- so reading it costs one lookup however many notes the owner has
+CREATE TABLE IF NOT EXISTS owner_versions (
+    owner   TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS notes_version_insert AFTER INSERT ON notes BEGIN
+    INSERT INTO owner_versions (owner, version) VALUES (new.owner, 1)
+        ON CONFLICT (owner) DO UPDATE SET version = version + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS notes_version_update AFTER UPDATE ON notes BEGIN
+    INSERT INTO owner_versions (owner, version) VALUES (old.owner, 1)
+        ON CONFLICT (owner) DO UPDATE SET version = version + 1;
+    INSERT INTO owner_versions (owner, version) SELECT new.owner, 1 WHERE new.owner != old.owner
+        ON CONFLICT (owner) DO UPDATE SET version = version + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS notes_version_delete AFTER DELETE ON notes BEGIN
+    INSERT INTO owner_versions (owner, version) VALUES (old.owner, 1)
+        ON CONFLICT (owner) DO UPDATE SET version = version + 1;
+END;
+""" % NOTES_TABLE.format(name="notes")
+
+
+# ---------------- SQLite backend ----------------
+
+class SqliteDatabase:
+    """One SQLite file shared by the note and user stores; a connection per thread."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self.connections = 0   # opened so far, one per thread that used the database
+        with self.connect() as db:
+            had_fts = db.execute("SELECT 1 FROM sqlite_master WHERE name = 'notes_fts'").fetchone()
+            self._upgrade_notes_table(db)
+            db.executescript(SCHEMA)
+            if not had_fts:
+                # Database from before the full-text index: index existing notes
+                db.execute("INSERT INTO notes_fts (notes_fts) VALUES ('rebuild')")
+
+    @staticmethod
+    def _upgrade_notes_table(db):
+        """Rebuild a notes table created without AUTOINCREMENT. Dropping the
+        old table also drops its indexes and triggers; SCHEMA recreates them.
+        The full-text index keeps the same rowids, so it stays valid."""
+        row = db.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'notes'").fetchone()
+        if row is None or "AUTOINCREMENT" in row[0].upper():
+            return
+        db.executescript(f"""
+            BEGIN;
+            {NOTES_TABLE.format(name="notes_upgraded")};
+            INSERT INTO notes_upgraded ({', '.join(NOTE_FIELDS)}) SELECT {', '.join(NOTE_FIELDS)} FROM notes;
+            DROP TABLE notes;
+            ALTER TABLE notes_upgraded RENAME TO notes;
+            COMMIT;
+        """)
+
+    def connect(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+            self.connections += 1
+        return db
+
+
+class SqliteNoteStore:
+    """NoteStore API on top of the notes table."""
+
+    def __init__(self, database):
+        self.database = database
+
+    def connect(self):
+        return self.database.connect()
+
+    def compact(self):
+        """Fold the WAL into the database and VACUUM away free pages."""
+        db = self.connect()
+        db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        db.execute("VACUUM")
+        db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    # ----- reads -----
+    def all(self, owner=None):
+        if owner is None:
+            rows = self.connect().execute("SELECT * FROM notes ORDER BY id")
+        else:
+            rows = self.connect().execute("SELECT * FROM notes WHERE owner = ? ORDER BY id", (owner,))
+        return [dict(r) for r in rows]
+
+    def get(self, owner, note_id):
+        row = self.connect().execute(
+            "SELECT * FROM notes WHERE id = ? AND owner = ?", (note_id, owner)).fetchone()
+        return dict(row) if row else None
+
+    def version(self, owner):
+        """owner's change counter from owner_versions; every insert, update or delete
+        of one of their notes bumps it."""
+        row = self.connect().execute(
+            "SELECT version FROM owner_versions WHERE owner = ?", (owner,)).fetchone()
+        return format_version(row[0] if row else 0)
+
+    def list(self, owner, status):
+        rows = self.connect().execute(
+            "SELECT * FROM notes WHERE owner = ? AND status = ? ORDER BY updated_at DESC",
+            (owner, status))
+        return [dict(r) for r in rows]
+
+    def page(self, owner, status, limit=None, before=None):
+        if limit is not None and limit < 1:
+            return [], None   # SQLite reads a negative LIMIT as no limit
+        sql = "SELECT * FROM notes WHERE owner = ? AND status = ?"
+        params = [owner, status]
+        if before:
+            sql += " AND (updated_at < ? OR (updated_at = ? AND id < ?))"
+            params += [before[0], before[0], before[1]]
+        sql += " ORDER BY updated_at DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit + 1)
+        notes = [dict(r) for r in self.connect().execute(sql, params)]
+        if limit is not None and len(notes) > limit:
+            notes = notes[:limit]
+            return notes, (notes[-1]["updated_at"], notes[-1]["id"])
+        return notes, None
+
+    def search(self, owner, query, status=None):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        match = " ".join('"%s"' % t for t in terms)
+        sql = ("SELECT notes.* FROM notes_fts JOIN notes ON notes.id = notes_fts.rowid "
+               "WHERE notes_fts MATCH ? AND notes.owner = ?")
+        params = [match, owner]
+        if status is not None:
+            sql += " AND notes.status = ?"
+            params.append(status)
+        return [dict(r) for r in self.connect().execute(sql, params)]
+
+    # ----- writes -----
+    def replace_all(self, notes, owner=None):
+        with self.connect() as db:
+            if owner is None:
+                db.execute("DELETE FROM notes")
+            else:
+                db.execute("DELETE FROM notes WHERE owner = ?", (owner,))
+            db.executemany(
+                "INSERT INTO notes (id, owner, title, content, status, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                ([n[f] for f in NOTE_FIELDS] for n in notes))
+
+    def add(self, owner, title, content):
+        with self.connect() as db:
+            cur = db.execute(
+                "INSERT INTO notes (owner, title, content, status, updated_at) VALUES (?, ?, ?, 'active', ?)",
+                (owner, title, content, time.time()))
+        return self.get(owner, cur.lastrowid)
+
+    def add_many(self, owner, notes):
+        added = []
+        with self.connect() as db:
+            for n in notes:
+                cur = db.execute(
+                    "INSERT INTO notes (owner, title, content, status, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (owner, n["title"], n["content"], n["status"], n["updated_at"]))
+                added.append(dict(n, id=cur.lastrowid, owner=owner))
+        return added
+
+    def update(self, owner, note_id, if_updated_at=None, **fields):
+        fields = {k: v for k, v in fields.items() if k in NOTE_FIELDS and k != "id"}
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        sql = f"UPDATE notes SET {assignments} WHERE id = ? AND owner = ?"
+        params = [*fields.values(), note_id, owner]
+        if if_updated_at is not None:
+            sql += " AND updated_at = ?"
+            params.append(if_updated_at)
+        with self.connect() as db:
+            cur = db.execute(sql, params)
+        note = self.get(owner, note_id)
+        if not cur.rowcount and note is not None and if_updated_at is not None:
+            raise NoteConflict(note)
+        return note if cur.rowcount else None
+
+    def update_many(self, owner, note_ids, **fields):
+        fields = {k: v for k, v in fields.items() if k in NOTE_FIELDS and k != "id"}
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        with self.connect() as db:
+            cur = db.executemany(f"UPDATE notes SET {assignments} WHERE id = ? AND owner = ?",
+                                 [(*fields.values(), note_id, owner) for note_id in set(note_ids)])
+        return cur.rowcount
+
+    def delete(self, owner, note_id):
+        with self.connect() as db:
+            cur = db.execute("DELETE FROM notes WHERE id = ? AND owner = ?", (note_id, owner))
+        return cur.rowcount > 0
+
+    def delete_many(self, owner, note_ids):
+        with self.connect() as db:
+            cur = db.executemany("DELETE FROM notes WHERE id = ? AND owner = ?",
+                                 [(note_id, owner) for note_id in set(note_ids)])
+        return cur.rowcount
+
+    def rename_owner(self, old_email, new_email):
+        with self.connect() as db:
+            cur = db.execute("UPDATE notes SET owner = ? WHERE lower(trim(owner)) = ?",
+                             (new_email, old_email.strip().lower()))
+        return cur.rowcount > 0
+
+
+class SqliteUserStore:
+    """UserStore API on top of the users table."""
+
+    def __init__(self, database):
+        self.database = database
+
+    def connect(self):
+        return self.database.connect()
+
+    def all(self):
+        return [self._user(r) for r in self.connect().execute("SELECT * FROM users ORDER BY id")]
+
+    def find(self, email):
+        row = self.connect().execute("SELECT * FROM users WHERE email = ?", (email,)).fetchone()
+        return self._user(row) if row else None
+
+    def find_by(self, field, value):
+        if field not in ("email", "username", "contact"):
+            raise ValueError(f"Users cannot be looked up by {field!r}")
+        row = self.connect().execute(f"SELECT * FROM users WHERE {field} = ?", (value,)).fetchone()
+        return self._user(row) if row else None
+
+    @staticmethod
+    def _user(row):
+        user = dict(row)
+        del user["id"]
+        return user
+
+    def add(self, user):
+        with self.connect() as db:
+            db.execute(
+                f"INSERT INTO users ({', '.join(USER_FIELDS)}) VALUES ({', '.join('?' * len(USER_FIELDS))})",
+                [user.get(f) for f in USER_FIELDS])
+
+    def update(self, email, updated_data):
+        fields = {k: v for k, v in updated_data.items() if k in USER_FIELDS}
+        if not fields:
+            return False
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        with self.connect() as db:
+            cur = db.execute(f"UPDATE users SET {assignments} WHERE email = ?", (*fields.values(), email))
+        return cur.rowcount > 0
+
+    def replace_all(self, users):
+        with self.connect() as db:
+            db.execute("DELETE FROM users")
+            db.executemany(
+                f"INSERT INTO users ({', '.join(USER_FIELDS)}) VALUES ({', '.join('?' * len(USER_FIELDS))})",
+                ([u.get(f) for f in USER_FIELDS] for u in users))
@@ -0,0 +1,805 @@
+import hashlib
+import os
+import threading
+from bisect import bisect_left, insort
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import quote
+
+from locking import TEMP_PREFIX, FileLock, RWLock, atomic_write, file_signature
+from search import SearchIndex
+from user_index import UserIndex
+
+STATUSES = ("active", "archived")
+
+
+class NoteConflict(Exception):
+    """update(if_updated_at=...) found the note changed since the caller read it."""
+
+    def __init__(self, note):
+        super().__init__(note["id"])
+        self.note = note
+
+
+def note_digest(note_id, updated_at, status):
+    """64-bit hash of what identifies one version of a note.
+
+    An owner's collection version is the XOR of their notes' digests: it can
+    be kept up to date in O(1) per change, and every worker process computes
+    the same value for the same notes.
+    """
+    key = f"{note_id}:{updated_at!r}:{status}".encode()
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "big")
+
+
+def format_version(digest):
+    return f"{digest:016x}"
+
+
+# ---------------- In-memory note store ----------------
+
+class NoteStore:
+    """Process-resident copy of notes.json, indexed by id and by (owner, status).
+
+    The file is parsed once on first use. Every mutation is expressed as a
+    record, applied to the indexes in place and then persisted: either by
+    writing the full list back through `save`, or, when a journal is given,
+    by appending just that record and checkpointing every `checkpoint_every`
+    records. If persisting fails the store reloads from the files, so memory
+    never holds changes the disk doesn't. The indexed notes are the store's
+    own copies; callers always get copies back.
+
+    Several worker processes may share the files. Writers hold a cross-process
+    FileLock and reload first if another process changed the files since we
+    last read them, so no update is lost. Readers take no file lock; they only
+    compare the files' stat signature and reload when it moved.
+
+    With write_behind=True mutations are only applied in memory and queued;
+    flush() (called by a Flusher) writes them all at once. Pending changes
+    win over the files, so use it with a single worker process.
+    """
+
+    def __init__(self, path, load, save, journal=None, checkpoint_every=1000, allocate_id=None,
+                 write_behind=False):
+        self.path = path
+        self._load = load
+        self._save = save
+        self.journal = journal
+        self.checkpoint_every = checkpoint_every
+        self._allocate_id = allocate_id   # allocate_id(count) -> first of count new ids
+        self.write_behind = write_behind
+        self._pending = []          # records applied in memory but not yet written
+        self._rwlock = RWLock()
+        self._file_lock = FileLock(path + ".lock")
+        self._signature = None
+        self.loaded = False
+        self.by_id = {}
+        self.by_owner_status = {}   # (owner, status) -> {note_id: note}
+        self.by_normalized_owner = {}   # owner.strip().lower() -> {note_id, ...}
+        self.sorted_keys = {}       # (owner, status) -> [(updated_at, note_id), ...] ascending
+        self.owner_digests = {}     # owner -> XOR of note_digest() over their notes
+        self.next_id = 1            # persisted with the snapshot; ids are never reused
+        self.search_index = SearchIndex()
+
+    # ----- loading / indexing -----
+    def _current_signature(self):
+        journal_signature = file_signature(self.journal.path) if self.journal is not None else None
+        return (file_signature(self.path), journal_signature)
+
+    def _is_stale(self):
+        if not self.loaded:
+            return True
+        # Reloading now would throw away mutations not flushed yet
+        return not self._pending and self._current_signature() != self._signature
+
+    def _reload(self):
+        # Stat before reading: a write landing in between then looks like a
+        # change still to be read (one extra reload), never like one already seen
+        self._signature = self._current_signature()
+        data = self._load(self.path)
+        notes = data.get("notes", []) if isinstance(data, dict) else []
+        self.next_id = data.get("next_id", 1) if isinstance(data, dict) else 1
+        self._build(notes)
+        if self.journal is not None:
+            for record in self.journal.replay():
+                self._apply(record)
+        self.loaded = True
+
+    def refresh(self):
+        """Reload if this is the first use or another process changed the files."""
+        if self._is_stale():
+            with self._rwlock.write():
+                if self._is_stale():
+                    self._reload()
+
+    @contextmanager
+    def _reading(self):
+        self.refresh()
+        with self._rwlock.read():
+            yield
+
+    @contextmanager
+    def _writing(self):
+        with self._rwlock.write(), self._file_lock:
+            if self._is_stale():
+                self._reload()
+            yield
+            self._signature = self._current_signature()
+
+    def _build(self, notes):
+        self.by_id = {}
+        self.by_owner_status = {}
+        self.by_normalized_owner = {}
+        self.owner_digests = {}
+        self.search_index.clear()
+        for n in notes:
+            self._index(dict(n), sort=False)   # `notes` may be load()'s cached data
+        # Snapshots written before next_id was stored
+        self.next_id = max(self.next_id, max(self.by_id, default=0) + 1)
+        # One sort per bucket instead of an insort per note
+        self.sorted_keys = {
+            key: sorted((n["updated_at"], n["id"]) for n in bucket.values())
+            for key, bucket in self.by_owner_status.items()
+        }
+
+    def _index(self, note, sort=True):
+        key = (note["owner"], note["status"])
+        self.by_id[note["id"]] = note
+        self.by_owner_status.setdefault(key, {})[note["id"]] = note
+        self.by_normalized_owner.setdefault(note["owner"].strip().lower(), set()).add(note["id"])
+        self._toggle_digest(note)
+        if sort:
+            insort(self.sorted_keys.setdefault(key, []), (note["updated_at"], note["id"]))
+        self.search_index.add(note)
+
+    def _toggle_digest(self, note):
+        digest = self.owner_digests.get(note["owner"], 0) ^ note_digest(note["id"], note["updated_at"], note["status"])
+        if digest:
+            self.owner_digests[note["owner"]] = digest
+        else:
+            self.owner_digests.pop(note["owner"], None)
+
+    def _unindex(self, note):
+        key = (note["owner"], note["status"])
+        if self.by_id.get(note["id"]) is note:
+            self._toggle_digest(note)
+        self.by_id.pop(note["id"], None)
+        self.search_index.discard(note)
+        bucket = self.by_owner_status.get(key)
+        if bucket is not None:
+            bucket.pop(note["id"], None)
+            if not bucket:
+                del self.by_owner_status[key]
+        normalized = note["owner"].strip().lower()
+        owned = self.by_normalized_owner.get(normalized)
+        if owned is not None:
+            owned.discard(note["id"])
+            if not owned:
+                del self.by_normalized_owner[normalized]
+        keys = self.sorted_keys.get(key)
+        if keys is not None:
+            i = bisect_left(keys, (note["updated_at"], note["id"]))
+            if i < len(keys) and keys[i] == (note["updated_at"], note["id"]):
+                del keys[i]
+            if not keys:
+                del self.sorted_keys[key]
+
+    # ----- records -----
+    # Every record is idempotent, so replaying a journal on top of a snapshot
+    # that already contains some of it is harmless.
+    def _apply(self, record):
+        op = record["op"]
+        if op == "add":
+            self.next_id = max(self.next_id, record["note"]["id"] + 1)
+            old = self.by_id.get(record["note"]["id"])
+            if old is not None:
+                self._unindex(old)
+            self._index(dict(record["note"]))
+        elif op == "set":
+            note = self.by_id.get(record["id"])
+            if note is not None:
+                self._unindex(note)
+                note.update(record["fields"])
+                self._index(note)
+        elif op == "del":
+            note = self.by_id.get(record["id"])
+            if note is not None:
+                self._unindex(note)
+        elif op == "owner":
+            for note_id in record["ids"]:
+                note = self.by_id.get(note_id)
+                if note is not None:
+                    self._unindex(note)
+                    note["owner"] = record["owner"]
+                    self._index(note)
+
+    def _commit(self, *records):
+        """Apply records and persist them with one save or one journal append."""
+        if not records:
+            return
+        for record in records:
+            self._apply(record)
+        if self.write_behind:
+            self._pending.extend(records)
+            return
+        try:
+            self._write(records)
+        except BaseException:
+            self._rollback()
+            raise
+
+    def _rollback(self):
+        """A write failed: the files still hold the state before it, so reload them."""
+        self.loaded = False
+        self._reload()
+
+    def _write(self, records):
+        if self.journal is None:
+            self._persist()
+            return
+        self.journal.append_many(records)
+        if self.journal.count >= self.checkpoint_every:
+            self.checkpoint()
+
+    def _persist(self):
+        self._save(self.path, {"notes": list(self.by_id.values()), "next_id": self.next_id})
+
+    def checkpoint(self):
+        """Write a full snapshot and start an empty journal."""
+        self._persist()
+        self._pending = []
+        if self.journal is not None:
+            self.journal.truncate()
+
+    def compact(self):
+        """Rewrite the snapshot in the configured format and empty the journal."""
+        with self._writing():
+            self.checkpoint()
+
+    def flush(self):
+        """Write mutations queued in write-behind mode: one save or one journal append."""
+        with self._rwlock.write(), self._file_lock:
+            if self._pending:
+                self._write(self._pending)
+                self._pending = []
+                self._signature = self._current_signature()
+
+    # ----- reads -----
+    def _get(self, owner, note_id):
+        note = self.by_id.get(note_id)
+        if note is None or note["owner"] != owner:
+            return None
+        return note
+
+    def _owned(self, owner):
+        return [n for status in STATUSES for n in self.by_owner_status.get((owner, status), {}).values()]
+
+    def all(self, owner=None):
+        with self._reading():
+            notes = self.by_id.values() if owner is None else self._owned(owner)
+            return [dict(n) for n in notes]
+
+    def get(self, owner, note_id):
+        with self._reading():
+            note = self._get(owner, note_id)
+            return dict(note) if note is not None else None
+
+    def version(self, owner):
+        """Changes whenever any of owner's notes is added, edited, moved or deleted."""
+        with self._reading():
+            return format_version(self.owner_digests.get(owner, 0))
+
+    def list(self, owner, status):
+        with self._reading():
+            return [dict(n) for n in self.by_owner_status.get((owner, status), {}).values()]
+
+    def page(self, owner, status, limit=None, before=None):
+        """owner's notes with `status`, newest first, from the sorted key list.
+
+        `before` is an (updated_at, id) cursor: only notes older than it are
+        returned. Returns (notes, cursor for the next page or None).
+        """
+        with self._reading():
+            keys = self.sorted_keys.get((owner, status), [])
+            end = bisect_left(keys, tuple(before)) if before else len(keys)
+            start = 0 if limit is None else min(end, max(0, end - limit))
+            notes = [dict(self.by_id[note_id]) for _, note_id in reversed(keys[start:end])]
+            return notes, (keys[start] if 0 < start < end else None)
+
+    def search(self, owner, query, status=None):
+        """owner's notes containing every word of query, optionally of one status."""
+        with self._reading():
+            if not self.search_index.is_built(owner):
+                self.search_index.build(owner, self._owned(owner))
+            notes = (self.by_id.get(note_id) for note_id in self.search_index.search(owner, query))
+            return [dict(n) for n in notes if n is not None and (status is None or n["status"] == status)]
+
+    # ----- writes -----
+    def replace_all(self, notes, owner=None):
+        """Replace every note, or only owner's notes when owner is given."""
+        with self._writing():
+            if owner is None:
+                self._build(notes)
+            else:
+                for n in self._owned(owner):
+                    self._unindex(n)
+                for n in notes:
+                    self._index(dict(n))
+            try:
+                self.checkpoint()
+            except BaseException:
+                self._rollback()
+                raise
+
+    def add(self, owner, title, content):
+        with self._writing():
+            note = {
+                "id": self._allocate_id(1) if self._allocate_id else self.next_id,
+                "owner": owner,
+                "title": title,
+                "content": content,
+                "status": "active",
+                "updated_at": time.time()
+            }
+            self._commit({"op": "add", "note": note})
+            return dict(self.by_id[note["id"]])
+
+    def add_many(self, owner, notes):
+        """Add notes (title, content, status, updated_at) for owner in one write.
+        Each gets a new id; returns the stored notes."""
+        with self._writing():
+            notes = list(notes)
+            if not notes:
+                return []
+            first_id = self._allocate_id(len(notes)) if self._allocate_id else self.next_id
+            records = [{"op": "add", "note": dict(n, id=first_id + i, owner=owner)}
+                       for i, n in enumerate(notes)]
+            self._commit(*records)
+            return [dict(self.by_id[r["note"]["id"]]) for r in records]
+
+    def put_many(self, notes):
+        """Insert or overwrite whole notes, keeping their ids (used to move notes between stores)."""
+        with self._writing():
+            self._commit(*[{"op": "add", "note": dict(n)} for n in notes])
+
+    def update(self, owner, note_id, if_updated_at=None, **fields):
+        """Apply `fields` to one of `owner`'s notes and bump updated_at.
+
+        With if_updated_at, raise NoteConflict instead unless the note's
+        updated_at still equals it (optimistic concurrency for autosave).
+        """
+        with self._writing():
+            note = self._get(owner, note_id)
+            if note is None:
+                return None
+            if if_updated_at is not None and note["updated_at"] != if_updated_at:
+                raise NoteConflict(dict(note))
+            self._commit({"op": "set", "id": note_id, "fields": dict(fields, updated_at=time.time())})
+            return dict(note)
+
+    def update_many(self, owner, note_ids, **fields):
+        """Apply `fields` to several of owner's notes in one write; returns how many changed."""
+        with self._writing():
+            now = time.time()
+            records = [{"op": "set", "id": note_id, "fields": dict(fields, updated_at=now)}
+                       for note_id in set(note_ids) if self._get(owner, note_id) is not None]
+            self._commit(*records)
+            return len(records)
+
+    def delete(self, owner, note_id):
+        with self._writing():
+            if self._get(owner, note_id) is None:
+                return False
+            self._commit({"op": "del", "id": note_id})
+            return True
+
+    def delete_many(self, owner, note_ids):
+        with self._writing():
+            records = [{"op": "del", "id": note_id}
+                       for note_id in set(note_ids) if self._get(owner, note_id) is not None]
+            self._commit(*records)
+            return len(records)
+
+    def rename_owner(self, old_email, new_email):
+        """Move every note whose owner matches old_email (case-insensitive) to new_email."""
+        with self._writing():
+            ids = sorted(self.by_normalized_owner.get(old_email.strip().lower(), ()))
+            if ids:
+                self._commit({"op": "owner", "ids": ids, "owner": new_email})
+            return bool(ids)
+
+
+# ---------------- Per-owner shards ----------------
+
+class IdSequence:
+    """Next note id kept in a small file, shared by every shard and worker."""
+
+    def __init__(self, path, initial):
+        self.path = path
+        self._initial = initial   # returns the highest id in use, for a missing file
+        self._file_lock = FileLock(path + ".lock")
+
+    def next(self, count=1):
+        """Reserve `count` consecutive ids with one locked write; returns the first."""
+        with self._file_lock:
+            try:
+                with open(self.path, "r") as f:
+                    value = int(f.read())
+            except (FileNotFoundError, ValueError):
+                value = self._initial() + 1
+            atomic_write(self.path, lambda f: f.write(str(value + count)))
+            return value
+
+
+class ShardedNoteStore:
+    """Notes split into one file per owner under `directory`.
+
+    Each shard is a NoteStore of its own, so a request only parses and
+    rewrites the session user's notes. Ids stay globally unique through a
+    shared IdSequence. Recently used shards stay loaded, up to `max_shards`.
+    """
+
+    def __init__(self, directory, load, save, sequence_path, legacy=None, max_shards=1024,
+                 write_behind=False):
+        self.directory = directory
+        self._load = load
+        self._save = save
+        self.max_shards = max_shards
+        self.write_behind = write_behind
+        self._shards = OrderedDict()
+        self._shards_lock = threading.Lock()
+        self._dir_lock = FileLock(directory + ".lock")
+        self.sequence = IdSequence(sequence_path, self._max_id)
+        if not os.path.isdir(directory):
+            self._split(legacy)
+        self._remove_stale_temp_files()
+
+    def _split(self, legacy):
+        """First start: create the directory, splitting the notes of the `legacy` store."""
+        directory = self.directory
+        with self._dir_lock:
+            if os.path.isdir(directory):
+                return
+            os.makedirs(directory + ".tmp", exist_ok=True)
+            groups = {}
+            for n in (legacy.all() if legacy is not None else []):
+                groups.setdefault(self._key(n["owner"]), []).append(n)
+            for key, notes in groups.items():
+                self._save(os.path.join(directory + ".tmp", key), {"notes": notes})
+            if legacy is not None and not os.path.exists(self.sequence.path):
+                # Ids of notes deleted from the old store are not handed out again
+                atomic_write(self.sequence.path, lambda f: f.write(str(legacy.next_id)))
+            os.replace(directory + ".tmp", directory)
+
+    @staticmethod
+    def _key(owner):
+        # Case-insensitive like update_note_owner's matching; safe as a file name
+        return quote(owner.strip().lower(), safe="@.-_") + ".json"
+
+    def _shard_path(self, owner):
+        return os.path.join(self.directory, self._key(owner))
+
+    def _shard_paths(self):
+        # atomic_write's temp files also end in .json; one left by a crash is not a shard
+        return [e.path for e in os.scandir(self.directory)
+                if e.name.endswith(".json") and not e.name.startswith(TEMP_PREFIX)]
+
+    def _remove_stale_temp_files(self, max_age=3600):
+        """Delete temp files (and their locks) left behind by a crashed write.
+        Recent ones may still be in use by another worker and are kept."""
+        cutoff = time.time() - max_age
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith(TEMP_PREFIX):
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    def _shard(self, owner):
+        path = self._shard_path(owner)
+        with self._shards_lock:
+            store = self._shards.pop(path, None)
+            if store is None:
+                store = NoteStore(path, self._load, self._save, allocate_id=self.sequence.next,
+                                  write_behind=self.write_behind)
+            self._shards[path] = store
+            while len(self._shards) > self.max_shards:
+                self._shards.popitem(last=False)[1].flush()
+            return store
+
+    def compact(self):
+        """Rewrite every shard and remove the files of owners with no notes left."""
+        self.flush()
+        with self._dir_lock:
+            self._remove_stale_temp_files()
+            for path in self._shard_paths():
+                shard = NoteStore(path, self._load, self._save)
+                shard.compact()
+                if not shard.all():
+                    os.remove(path)
+            with self._shards_lock:
+                self._shards.clear()
+
+    def flush(self):
+        """Write pending mutations of every loaded shard."""
+        with self._shards_lock:
+            shards = list(self._shards.values())
+        for shard in shards:
+            shard.flush()
+
+    def _saved_notes(self):
+        notes = []
+        for path in self._shard_paths():
+            data = self._load(path)
+            notes.extend(data.get("notes", []) if isinstance(data, dict) else [])
+        return notes
+
+    def _max_id(self):
+        # Called from inside a shard's write, so it must not flush
+        return max((n["id"] for n in self._saved_notes()), default=0)
+
+    # ----- reads -----
+    def all(self, owner=None):
+        if owner is not None:
+            return self._shard(owner).all(owner)
+        self.flush()
+        return [dict(n) for n in self._saved_notes()]
+
+    def get(self, owner, note_id):
+        return self._shard(owner).get(owner, note_id)
+
+    def version(self, owner):
+        return self._shard(owner).version(owner)
+
+    def list(self, owner, status):
+        return self._shard(owner).list(owner, status)
+
+    def page(self, owner, status, limit=None, before=None):
+        return self._shard(owner).page(owner, status, limit, before)
+
+    def search(self, owner, query, status=None):
+        return self._shard(owner).search(owner, query, status)
+
+    # ----- writes -----
+    def replace_all(self, notes, owner=None):
+        if owner is not None:
+            self._shard(owner).replace_all(notes, owner)
+            return
+        self.flush()
+        groups = {}
+        for n in notes:
+            groups.setdefault(self._shard_path(n["owner"]), []).append(dict(n))
+        with self._dir_lock:
+            for path in self._shard_paths():
+                if path not in groups:
+                    os.remove(path)
+            for path, shard_notes in groups.items():
+                self._save(path, {"notes": shard_notes})
+            with self._shards_lock:
+                self._shards.clear()
+
+    def add(self, owner, title, content):
+        return self._shard(owner).add(owner, title, content)
+
+    def add_many(self, owner, notes):
+        return self._shard(owner).add_many(owner, notes)
+
+    def update(self, owner, note_id, if_updated_at=None, **fields):
+        return self._shard(owner).update(owner, note_id, if_updated_at, **fields)
+
+    def update_many(self, owner, note_ids, **fields):
+        return self._shard(owner).update_many(owner, note_ids, **fields)
+
+    def delete(self, owner, note_id):
+        return self._shard(owner).delete(owner, note_id)
+
+    def delete_many(self, owner, note_ids):
+        return self._shard(owner).delete_many(owner, note_ids)
+
+    def rename_owner(self, old_email, new_email):
+        """Rename old_email's shard file to new_email's, then restamp the owner field
+        inside that one shard. Costs O(notes owned), not O(all notes)."""
+        old_path, new_path = self._shard_path(old_email), self._shard_path(new_email)
+        self.flush()
+        with self._dir_lock:
+            if not os.path.exists(old_path):
+                return False
+            if old_path != new_path:
+                with self._shards_lock:
+                    self._shards.pop(old_path, None)
+                    self._shards.pop(new_path, None)
+                if os.path.exists(new_path):
+                    # Both addresses already have notes: merge into the new shard
+                    moved = NoteStore(old_path, self._load, self._save).all()
+                    target = self._shard(new_email)
+                    target.replace_all(target.all() + moved)
+                    os.remove(old_path)
+                else:
+                    os.replace(old_path, new_path)
+            return self._shard(new_email).rename_owner(old_email, new_email)
+
+
+# ---------------- Hot / cold tiers ----------------
+
+class TieredNoteStore:
+    """Active notes in a hot NoteStore, archived ones in a cold one.
+
+    The cold store lives in a gzip-compressed file, so home pages only load
+    and rewrite the active working set, and the archive page only the cold
+    tier. Archiving or restoring moves the note between the two: it is
+    written to the destination first, so a crash in between leaves a
+    duplicate rather than losing the note.
+    """
+
+    def __init__(self, hot, cold):
+        self.hot = hot
+        self.cold = cold
+        if not os.path.exists(cold.path):
+            # First start: move archived notes out of the single store
+            notes = hot.all()
+            cold.replace_all([n for n in notes if n["status"] == "archived"])
+            hot.replace_all([n for n in notes if n["status"] != "archived"])
+
+    @property
+    def next_id(self):
+        return max(self.hot.next_id, self.cold.next_id)
+
+    def _tier(self, status):
+        return self.cold if status == "archived" else self.hot
+
+    def flush(self):
+        self.hot.flush()
+        self.cold.flush()
+
+    def compact(self):
+        self.hot.compact()
+        self.cold.compact()
+
+    # ----- reads -----
+    def all(self, owner=None):
+        return self.hot.all(owner) + self.cold.all(owner)
+
+    def get(self, owner, note_id):
+        return self.hot.get(owner, note_id) or self.cold.get(owner, note_id)
+
+    def version(self, owner):
+        # XOR of two XORs is the digest over both tiers
+        return format_version(int(self.hot.version(owner), 16) ^ int(self.cold.version(owner), 16))
+
+    def list(self, owner, status):
+        return self._tier(status).list(owner, status)
+
+    def page(self, owner, status, limit=None, before=None):
+        return self._tier(status).page(owner, status, limit, before)
+
+    def search(self, owner, query, status=None):
+        if status is not None:
+            return self._tier(status).search(owner, query, status)
+        return self.hot.search(owner, query) + self.cold.search(owner, query)
+
+    # ----- writes -----
+    def replace_all(self, notes, owner=None):
+        self.hot.replace_all([n for n in notes if n["status"] != "archived"], owner)
+        self.cold.replace_all([n for n in notes if n["status"] == "archived"], owner)
+
+    def add(self, owner, title, content):
+        return self.hot.add(owner, title, content)
+
+    def add_many(self, owner, notes):
+        # Ids come from the hot store; archived ones then move to the cold tier
+        added = [dict(n) for n in self.hot.add_many(owner, notes)]
+        archived = [n for n in added if n["status"] == "archived"]
+        if archived:
+            self.cold.put_many(archived)
+            self.hot.delete_many(owner, [n["id"] for n in archived])
+        return added
+
+    def update(self, owner, note_id, if_updated_at=None, **fields):
+        if "status" not in fields:
+            tier = self.hot if self.hot.get(owner, note_id) is not None else self.cold
+            return tier.update(owner, note_id, if_updated_at, **fields)
+        if if_updated_at is not None:
+            # Moves are not atomic across tiers; compare before moving
+            note = self.get(owner, note_id)
+            if note is not None and note["updated_at"] != if_updated_at:
+                raise NoteConflict(dict(note))
+        if not self.update_many(owner, [note_id], **fields):
+            return None
+        return self.get(owner, note_id)
+
+    def update_many(self, owner, note_ids, **fields):
+        if "status" not in fields:
+            return self.hot.update_many(owner, note_ids, **fields) + self.cold.update_many(owner, note_ids, **fields)
+        target = self._tier(fields["status"])
+        source = self.hot if target is self.cold else self.cold
+        moving = [n for n in (source.get(owner, i) for i in set(note_ids)) if n is not None]
+        now = time.time()
+        target.put_many([dict(n, **fields, updated_at=now) for n in moving])
+        source.delete_many(owner, [n["id"] for n in moving])
+        moved_ids = {n["id"] for n in moving}
+        return len(moving) + target.update_many(owner, [i for i in note_ids if i not in moved_ids], **fields)
+
+    def delete(self, owner, note_id):
+        return self.hot.delete(owner, note_id) or self.cold.delete(owner, note_id)
+
+    def delete_many(self, owner, note_ids):
+        return self.hot.delete_many(owner, note_ids) + self.cold.delete_many(owner, note_ids)
+
+    def rename_owner(self, old_email, new_email):
+        moved_hot = self.hot.rename_owner(old_email, new_email)
+        moved_cold = self.cold.rename_owner(old_email, new_email)
+        return moved_hot or moved_cold
+
+
+# ---------------- JSON user store ----------------
+
+class UserStore:
+    """users.json accessed through the same small API as the SQLite backend.
+
+    The parsed list is kept with a UserIndex for O(1) lookups and reused
+    until the file's stat signature changes. Our own writes save a new list
+    and index and only swap them in once the save succeeded, recording the
+    signature `save` returns, so they cost no re-parse; lock-free readers
+    see either the old state or the new one.
+    """
+
+    def __init__(self, path, load, save):
+        self.path = path
+        self._load = load
+        self._save = save
+        self._file_lock = FileLock(path + ".lock")
+        self._state = (None, [], UserIndex())   # (signature, users, index)
+
+    def _current(self):
+        signature, users, index = self._state
+        current = file_signature(self.path)
+        if current != signature:
+            signature = current
+            data = self._load(self.path)
+            if isinstance(data, dict):
+                # Convert dict -> list if old format
+                data = list(data.values())
+            users = [dict(u) for u in data] if isinstance(data, list) else []
+            index = UserIndex(users)
+            self._state = (signature, users, index)
+        return users, index
+
+    def _write(self, users, index):
+        self._state = (self._save(self.path, users), users, index)
+
+    def all(self):
+        return list(self._current()[0])
+
+    def find(self, email):
+        return self._current()[1].get("email", email)
+
+    def find_by(self, field, value):
+        """Look a user up by email, username or contact."""
+        return self._current()[1].get(field, value)
+
+    def add(self, user):
+        with self._file_lock:
+            users, index = self._current()
+            index = index.copy()
+            index.add(user)
+            self._write(users + [user], index)
+
+    def update(self, email, updated_data):
+        with self._file_lock:
+            users, index = self._current()
+            user = index.get("email", email)
+            if user is None:
+                return False
+            updated = dict(user, **updated_data)
+            index = index.copy()
+            index.remove(user)
+            index.add(updated)
+            self._write([updated if u is user else u for u in users], index)
+            return True
+
+    def replace_all(self, users):
+        with self._file_lock:
+            users = [dict(u) for u in users]
+            self._write(users, UserIndex(users))
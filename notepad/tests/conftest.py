@@ -0,0 +1,25 @@
+import os
+import sys
+
+# The app's modules import each other as top-level modules (run from notepad/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Point utils' data files at tmp_path, with fresh stores before and after."""
+    import maintenance
+    import utils
+
+    for name in ("USERS_FILE", "NOTES_FILE", "NOTES_JOURNAL_FILE", "NOTES_SHARD_DIR", "NOTES_SEQUENCE_FILE",
+                 "NOTES_ARCHIVE_FILE", "NOTES_MMAP_FILE", "NOTES_HISTORY_DIR"):
+        monkeypatch.setattr(utils, name, str(tmp_path / os.path.basename(getattr(utils, name))))
+    monkeypatch.setattr(utils, "_history", None)
+    monkeypatch.setattr(maintenance, "DATA_DIR", str(tmp_path))
+    monkeypatch.setenv("SQLITE_PATH", str(tmp_path / "notepad.db"))
+    options = utils.store_options()
+    utils.configure_store(sqlite_path=str(tmp_path / "notepad.db"))
+    yield tmp_path
+    utils.configure_store(**options)
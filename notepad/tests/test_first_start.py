@@ -0,0 +1,21 @@
+import pytest
+
+from utils import configure_store, get_store
+
+
+@pytest.mark.parametrize("backend", ["sharded", "mmap"])
+def test_first_start_imports_journal_and_cold_tier(data_dir, backend):
+    configure_store(backend="json", journal=True, cold_tier=True)
+    store = get_store()
+    store.add("a@x.com", "active", "")
+    archived = store.add("a@x.com", "archived", "")
+    store.update("a@x.com", archived["id"], status="archived")
+    deleted = store.add("b@x.com", "deleted", "")
+    store.delete("b@x.com", deleted["id"])
+    assert (data_dir / "notes.journal").stat().st_size > 0
+
+    configure_store(backend=backend, journal=False, cold_tier=False)
+    notes = get_store().all()
+    assert sorted((n["title"], n["status"]) for n in notes) == [("active", "active"), ("archived", "archived")]
+    # ids are not reused after the switch
+    assert get_store().add("a@x.com", "new", "")["id"] > deleted["id"]
@@ -0,0 +1,67 @@
+import signal
+import threading
+import time
+
+from flusher import Flusher
+from store import NoteStore
+from utils import load_json, save_json
+
+
+def counting_store(tmp_path, saves):
+    def save(path, data):
+        saves.append(len(data["notes"]))
+        return save_json(path, data)
+    return NoteStore(str(tmp_path / "notes.json"), load_json, save, write_behind=True)
+
+
+def test_burst_of_edits_is_one_write(tmp_path):
+    saves = []
+    store = counting_store(tmp_path, saves)
+    flusher = Flusher(store.flush, interval=0.05).start()
+    try:
+        note = store.add("a@x.com", "t", "")
+        for i in range(20):
+            store.update("a@x.com", note["id"], content=str(i))
+        deadline = time.time() + 5
+        while not saves and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        flusher.stop()
+    assert saves == [1]
+    assert load_json(str(tmp_path / "notes.json"))["notes"][0]["content"] == "19"
+
+
+def test_stop_writes_pending_changes(tmp_path):
+    saves = []
+    store = counting_store(tmp_path, saves)
+    flusher = Flusher(store.flush, interval=3600).start()
+    store.add("a@x.com", "t", "")
+    assert saves == []
+    flusher.stop()
+    assert saves == [1]
+
+
+def test_signal_during_a_write_is_flushed_off_the_main_thread():
+    store_lock = threading.Lock()
+    flushed_in, received = [], []
+
+    def flush():
+        # Like a store flush: needs the lock the interrupted write holds
+        if store_lock.acquire(timeout=5):
+            store_lock.release()
+            flushed_in.append(threading.current_thread().name)
+
+    original = signal.signal(signal.SIGTERM, lambda signum, frame: received.append(signum))
+    try:
+        flusher = Flusher(flush, interval=3600).start()
+        with store_lock:
+            signal.raise_signal(signal.SIGTERM)   # handler returns at once
+        deadline = time.time() + 5
+        while not received and time.time() < deadline:
+            time.sleep(0.01)
+        assert flushed_in == ["notes-flusher"]
+        assert received == [signal.SIGTERM]
+        assert signal.getsignal(signal.SIGTERM) != flusher._on_signal
+        flusher.stop()
+    finally:
+        signal.signal(signal.SIGTERM, original)
@@ -0,0 +1,28 @@
+import pytest
+
+from hashing import HashingBusy, HashingPool
+
+
+def test_pool_hashes_in_forkserver_or_spawned_processes():
+    pool = HashingPool(method="pbkdf2:sha256:1000", workers=1)
+    try:
+        h = pool.hash("secret")
+        assert pool.verify("secret", h) and not pool.verify("other", h)
+        assert pool._executor._mp_context.get_start_method() in ("forkserver", "spawn")
+    finally:
+        pool.shutdown()
+
+
+def test_default_worker_count_is_small():
+    assert 1 <= HashingPool().workers <= 2
+
+
+def test_saturated_pool_answers_busy():
+    pool = HashingPool(method="pbkdf2:sha256:1000", workers=1, max_queued=0)
+    pool._slots.acquire()   # one job already admitted
+    try:
+        with pytest.raises(HashingBusy):
+            pool.hash("secret")
+    finally:
+        pool._slots.release()
+        pool.shutdown()
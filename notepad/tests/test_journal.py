@@ -0,0 +1,41 @@
+import os
+
+from journal import NoteJournal
+from store import NoteStore
+from utils import load_json, save_json
+
+
+def open_store(tmp_path):
+    journal = NoteJournal(str(tmp_path / "notes.journal"))
+    return NoteStore(str(tmp_path / "notes.json"), load_json, save_json, journal=journal)
+
+
+def test_replay_restores_journaled_notes(tmp_path):
+    store = open_store(tmp_path)
+    store.add("a@x.com", "one", "1")
+    store.add("a@x.com", "two", "2")
+    assert sorted(n["title"] for n in open_store(tmp_path).all()) == ["one", "two"]
+
+
+def test_append_after_torn_line_is_not_lost(tmp_path):
+    store = open_store(tmp_path)
+    store.add("a@x.com", "before crash", "")
+    # A crash in the middle of an append leaves a line without its newline
+    with open(tmp_path / "notes.journal", "ab") as f:
+        f.write(b'{"op":"add","note":{"id":99,')
+
+    store = open_store(tmp_path)
+    assert [n["title"] for n in store.all()] == ["before crash"]
+    store.add("a@x.com", "after crash", "")
+    store.add("a@x.com", "later", "")
+
+    titles = sorted(n["title"] for n in open_store(tmp_path).all())
+    assert titles == ["after crash", "before crash", "later"]
+
+
+def test_checkpoint_empties_journal(tmp_path):
+    store = open_store(tmp_path)
+    store.add("a@x.com", "one", "")
+    store.compact()
+    assert os.path.getsize(tmp_path / "notes.journal") == 0
+    assert [n["title"] for n in open_store(tmp_path).all()] == ["one"]
@@ -0,0 +1,41 @@
+import time
+
+from maintenance import DAY, compact_notes
+from utils import add_user, get_store
+
+
+def add_notes():
+    store = get_store()
+    store.add("a@x.com", "kept", "")
+    store.add_many("a@x.com", [{"title": "old", "content": "", "status": "archived",
+                                "updated_at": time.time() - 40 * DAY}])
+    store.add("gone@x.com", "orphan", "")
+    return store
+
+
+def titles():
+    return sorted(n["title"] for n in get_store().all())
+
+
+def test_expired_archived_notes_are_purged(data_dir):
+    add_user({"username": "a", "email": "a@x.com", "contact": "09123456789", "password": "x"})
+    add_notes()
+    report = compact_notes(retention_days=30)
+    assert (report["expired"], report["orphaned"], report["orphans_purged"]) == (1, 1, 0)
+    assert titles() == ["kept", "orphan"]
+
+
+def test_orphans_are_only_purged_on_request(data_dir):
+    add_user({"username": "a", "email": "a@x.com", "contact": "09123456789", "password": "x"})
+    add_notes()
+    report = compact_notes(retention_days=None, purge_orphans=True)
+    assert (report["expired"], report["orphans_purged"]) == (0, 1)
+    assert titles() == ["kept", "old"]
+
+
+def test_unreadable_users_file_purges_no_orphans(data_dir):
+    add_notes()
+    (data_dir / "users.json").write_text("{not json")
+    report = compact_notes(retention_days=None, purge_orphans=True)
+    assert (report["orphaned"], report["orphans_purged"]) == (3, 0)
+    assert titles() == ["kept", "old", "orphan"]
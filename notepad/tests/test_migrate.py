@@ -0,0 +1,41 @@
+import json
+import sqlite3
+
+from journal import NoteJournal
+from migrate import migrate_json_to_sqlite
+from store import NoteStore, ShardedNoteStore, TieredNoteStore
+from utils import load_json, save_json
+
+
+def sqlite_titles(db_path):
+    with sqlite3.connect(db_path) as db:
+        return sorted(row[0] for row in db.execute("SELECT title FROM notes"))
+
+
+def test_journaled_notes_are_migrated(tmp_path):
+    journal = NoteJournal(str(tmp_path / "notes.journal"))
+    store = NoteStore(str(tmp_path / "notes.json"), load_json, save_json, journal=journal)
+    store.add("a@x.com", "journaled", "")
+    db_path = str(tmp_path / "notepad.db")
+
+    # No notes.json snapshot and no users.json exist yet
+    copied, skipped, notes = migrate_json_to_sqlite(db_path, str(tmp_path / "users.json"), notes=store)
+    assert (copied, skipped, notes) == (0, 0, 1)
+    assert sqlite_titles(db_path) == ["journaled"]
+
+
+def test_cold_tier_and_shards_are_migrated(tmp_path):
+    hot = ShardedNoteStore(str(tmp_path / "notes"), load_json, save_json,
+                           sequence_path=str(tmp_path / "notes.seq"))
+    cold = NoteStore(str(tmp_path / "archive.json"), load_json, save_json)
+    store = TieredNoteStore(hot, cold)
+    store.add("a@x.com", "active", "")
+    archived = store.add("b@x.com", "archived", "")
+    store.update("b@x.com", archived["id"], status="archived")
+    users = tmp_path / "users.json"
+    users.write_text(json.dumps([{"username": "a", "email": "a@x.com", "contact": "09123456789",
+                                  "password": "x"}]))
+
+    db_path = str(tmp_path / "notepad.db")
+    assert migrate_json_to_sqlite(db_path, str(users), notes=store) == (1, 0, 2)
+    assert sqlite_titles(db_path) == ["active", "archived"]
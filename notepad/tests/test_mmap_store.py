@@ -0,0 +1,60 @@
+import threading
+
+import pytest
+
+from mmap_store import MmapNoteStore
+from utils import configure_store
+
+
+def open_store(tmp_path):
+    return MmapNoteStore(str(tmp_path / "notes.mmap"))
+
+
+def test_page_walks_newest_first_with_a_cursor(tmp_path):
+    store = open_store(tmp_path)
+    notes = [store.add("a@x.com", str(i), "") for i in range(5)]
+    store.add("b@x.com", "other", "")
+    store.update("a@x.com", notes[1]["id"], status="archived")
+    page, cursor = store.page("a@x.com", "active", limit=2)
+    assert [n["title"] for n in page] == ["4", "3"]
+    page, cursor = store.page("a@x.com", "active", limit=2, before=cursor)
+    assert [n["title"] for n in page] == ["2", "0"] and cursor is None
+    assert [n["title"] for n in store.list("a@x.com", "archived")] == ["1"]
+
+
+def test_page_follows_status_changes_and_deletes(tmp_path):
+    store = open_store(tmp_path)
+    first = store.add("a@x.com", "first", "")
+    second = store.add("a@x.com", "second", "")
+    store.update("a@x.com", first["id"], title="edited")
+    store.delete("a@x.com", second["id"])
+    assert [n["title"] for n in store.list("a@x.com", "active")] == ["edited"]
+    assert [n["title"] for n in open_store(tmp_path).list("a@x.com", "active")] == ["edited"]
+
+
+def test_readers_survive_concurrent_remaps(tmp_path):
+    store = open_store(tmp_path)
+    store.add("a@x.com", "t", "")
+    errors, done = [], threading.Event()
+
+    def read():
+        try:
+            while not done.is_set():
+                store.list("a@x.com", "active")
+        except Exception as e:
+            errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for t in readers:
+        t.start()
+    for i in range(200):
+        store.add("a@x.com", str(i), "")
+    done.set()
+    for t in readers:
+        t.join()
+    assert errors == []
+
+
+def test_flush_interval_is_rejected_for_mmap():
+    with pytest.raises(ValueError):
+        configure_store(backend="mmap", flush_interval=5)
@@ -0,0 +1,54 @@
+import io
+import json
+
+import pytest
+
+from convert import convert
+from records import MAGIC, read_records, write_records
+from utils import configure_store, load_json, save_json
+
+NOTES = {"notes": [{"id": 1, "owner": "a@x.com", "title": "ü", "content": "", "status": "active",
+                    "updated_at": 1.5}, {"id": 2, "owner": "a@x.com", "title": "two", "content": "x",
+                                         "status": "archived", "updated_at": 2.0}], "next_id": 3}
+
+
+def written(data):
+    f = io.BytesIO()
+    write_records(f, data)
+    return f.getvalue()
+
+
+@pytest.mark.parametrize("data", [NOTES, [{"email": "a@x.com"}], {"next_id": 1}, []])
+def test_round_trip(data):
+    assert read_records(io.BytesIO(written(data))) == data
+
+
+def test_record_cut_off_mid_way_keeps_the_complete_ones():
+    raw = written(NOTES)
+    cut = raw[:-5]   # inside the last note
+    assert read_records(io.BytesIO(cut)) == dict(NOTES, notes=NOTES["notes"][:1])
+    assert read_records(io.BytesIO(MAGIC)) == []
+
+
+def test_convert_between_every_format(tmp_path):
+    path = str(tmp_path / "notes.json")
+    save_json(path, NOTES, "pretty")
+    for file_format in ("records", "compact", "pretty", "records"):
+        convert([path], file_format)
+        assert load_json(path) == NOTES
+    with open(path, "rb") as f:
+        assert f.read(len(MAGIC)) == MAGIC
+    convert([path], "compact")
+    assert json.loads((tmp_path / "notes.json").read_text()) == NOTES
+
+
+@pytest.mark.parametrize("options", [
+    {"backend": "sqlte"},
+    {"file_format": "json"},
+    {"backend": "sharded", "journal": True},
+    {"backend": "mmap", "cold_tier": True},
+    {"backend": "sqlite", "flush_interval": 5},
+])
+def test_unsupported_store_options_are_rejected(data_dir, options):
+    with pytest.raises(ValueError):
+        configure_store(**options)
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from app import create_app
+
+
+@pytest.fixture
+def client(data_dir, monkeypatch):
+    monkeypatch.setenv("HASH_WORKERS", "0")
+    app = create_app()
+    app.config["TESTING"] = True
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["username"] = "a@x.com"
+    return client
+
+
+def test_bulk_ignores_ids_that_are_not_numbers(client):
+    # "²".isdigit() is True but int("²") raises
+    response = client.post("/notes/bulk", data={"action": "archive", "note_ids": ["²", "x", "-1"]})
+    assert response.status_code == 302
+
+
+def test_metrics_are_off_by_default(client):
+    assert client.get("/metrics").status_code == 404
+
+
+def test_metrics_are_served_when_enabled(monkeypatch):
+    monkeypatch.setenv("HASH_WORKERS", "0")
+    monkeypatch.setenv("METRICS", "1")
+    client = create_app().test_client()
+    client.get("/auth/login")
+    body = client.get("/metrics").get_data(as_text=True)
+    assert 'notepad_requests_total{endpoint="auth_bp.login",method="GET",status="200"} 1' in body
+
+
+def test_profiling_adds_server_timing(monkeypatch):
+    monkeypatch.setenv("HASH_WORKERS", "0")
+    monkeypatch.setenv("PROFILE_REQUESTS", "1")
+    response = create_app().test_client().get("/auth/login")
+    stages = [part.split(";")[0] for part in response.headers["Server-Timing"].split(", ")]
+    assert "render" in stages and stages[-1] == "total"
+
+
+@pytest.mark.parametrize("limit", ["0", "-3"])
+def test_page_size_below_one_is_rejected(client, limit):
+    client.post("/api/notes", json={"title": "t"})
+    assert client.get(f"/api/notes?limit={limit}").status_code == 400
+
+
+def test_patch_of_a_note_deleted_meanwhile_is_404(client, monkeypatch):
+    import blueprints.api
+
+    note = client.post("/api/notes", json={"title": "t"}).get_json()
+    monkeypatch.setattr(blueprints.api, "patch_note", lambda *args: None)
+    assert client.patch(f"/api/notes/{note['id']}", json={"title": "u"}).status_code == 404
+
+
+def test_export_then_import_round_trip(client):
+    for title in ("one", "two"):
+        client.post("/api/notes", json={"title": title, "content": title * 2})
+    archived = client.post("/api/notes", json={"title": "three"}).get_json()
+    client.post(f"/api/notes/{archived['id']}/archive")
+    exported = client.get("/notes/export").get_data()
+    lines = exported.decode().splitlines()
+    assert len(lines) == 3
+
+    # Re-importing the same ids duplicates the notes under new ids; a bad line is skipped
+    body = exported + b'{"title": "no closing brace"\n' + b'\n' + b'{"content": "no title"}\n'
+    response = client.post("/notes/import", data=body, content_type="application/x-ndjson")
+    assert response.get_json() == {"imported": 3, "skipped": 2}
+
+    notes = [json.loads(line) for line in client.get("/notes/export").get_data().decode().splitlines()]
+    assert len({n["id"] for n in notes}) == 6
+    assert sorted((n["title"], n["content"], n["status"]) for n in notes) == sorted(
+        [(n["title"], n["content"], n["status"]) for n in map(json.loads, lines)] * 2)
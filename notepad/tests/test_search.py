@@ -0,0 +1,44 @@
+from search import SearchIndex, tokenize
+
+
+def note(note_id, title, content="", owner="a@x.com"):
+    return {"id": note_id, "owner": owner, "title": title, "content": content}
+
+
+def test_tokenize_splits_like_sqlite():
+    assert tokenize("Hello, snake_case World-2") == {"hello", "snake", "case", "world", "2"}
+
+
+def test_build_then_search():
+    index = SearchIndex()
+    index.build("a@x.com", [note(1, "Grocery list", "milk eggs"), note(2, "Trip", "pack eggs")])
+    assert index.search("a@x.com", "eggs") == {1, 2}
+    assert index.search("a@x.com", "EGGS milk") == {1}
+    assert index.search("a@x.com", "bread") == set()
+    assert index.search("a@x.com", "  ") == set()
+    assert index.search("b@x.com", "eggs") == set()
+
+
+def test_updates_follow_built_owners_only():
+    index = SearchIndex()
+    index.build("a@x.com", [note(1, "old title")])
+    index.add(note(1, "new title"))
+    index.add(note(2, "second"))
+    index.add(note(3, "other owner", owner="b@x.com"))
+    assert index.search("a@x.com", "old") == set()
+    assert index.search("a@x.com", "title") == {1}
+    index.discard(note(2, "second"))
+    assert index.search("a@x.com", "second") == set()
+    assert not index.is_built("b@x.com")
+
+
+def test_owner_is_not_visible_until_built():
+    index = SearchIndex()
+
+    def notes():
+        for i in range(3):
+            assert not index.is_built("a@x.com")
+            yield note(i, "word")
+
+    index.build("a@x.com", notes())
+    assert index.search("a@x.com", "word") == {0, 1, 2}
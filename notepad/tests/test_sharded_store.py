@@ -0,0 +1,67 @@
+import os
+import shutil
+
+from store import ShardedNoteStore
+from utils import load_json, save_json
+
+
+def open_store(tmp_path):
+    return ShardedNoteStore(str(tmp_path / "notes"), load_json, save_json,
+                            sequence_path=str(tmp_path / "notes.seq"))
+
+
+def leave_temp_file(tmp_path, age=0):
+    """What a crash inside atomic_write leaves next to a shard."""
+    shard = tmp_path / "notes" / "a%40x.com.json"
+    if not shard.exists():
+        shard = next((tmp_path / "notes").glob("*.json"))
+    temp = tmp_path / "notes" / (".tmp-abc123" + shard.name)
+    shutil.copy(shard, temp)
+    if age:
+        os.utime(temp, (os.path.getmtime(temp) - age,) * 2)
+    return temp
+
+
+def test_notes_are_spread_over_owner_shards(tmp_path):
+    store = open_store(tmp_path)
+    store.add("a@x.com", "a", "")
+    store.add("B@x.com", "b", "")
+    assert len(list((tmp_path / "notes").glob("*.json"))) == 2
+    assert [n["title"] for n in open_store(tmp_path).all("B@x.com")] == ["b"]
+
+
+def test_crashed_temp_file_is_not_a_shard(tmp_path):
+    store = open_store(tmp_path)
+    store.add("a@x.com", "only once", "")
+    leave_temp_file(tmp_path)
+
+    assert [n["title"] for n in open_store(tmp_path).all()] == ["only once"]
+    store = open_store(tmp_path)
+    store.compact()
+    assert [n["title"] for n in open_store(tmp_path).all()] == ["only once"]
+    assert not list((tmp_path / "notes").glob(".tmp-*.lock"))
+
+
+def test_stale_temp_files_are_removed_on_open(tmp_path):
+    open_store(tmp_path).add("a@x.com", "n", "")
+    stale = leave_temp_file(tmp_path, age=2 * 3600)
+    fresh = tmp_path / "notes" / ".tmp-fresh.json"
+    fresh.write_text("{}")
+    open_store(tmp_path)
+    assert not stale.exists()
+    assert fresh.exists()   # may still be another worker's write in progress
+
+
+def test_add_many_reserves_ids_with_one_write(tmp_path, monkeypatch):
+    store = open_store(tmp_path)
+    store.add("a@x.com", "first", "")
+    calls = []
+    next_ids = store.sequence.next
+    monkeypatch.setattr(store.sequence, "next", lambda count=1: calls.append(count) or next_ids(count))
+
+    added = store.add_many("b@x.com", [{"title": str(i), "content": "", "status": "active",
+                                        "updated_at": float(i)} for i in range(500)])
+    assert calls == [500]
+    ids = [n["id"] for n in added]
+    assert len(set(ids)) == 500 and min(ids) > 1
+    assert store.add("a@x.com", "after", "")["id"] == max(ids) + 1
@@ -0,0 +1,35 @@
+import sqlite3
+
+from sqlite_store import SqliteDatabase, SqliteNoteStore
+
+OLD_NOTES_TABLE = """CREATE TABLE notes (
+    id INTEGER PRIMARY KEY, owner TEXT NOT NULL, title TEXT NOT NULL,
+    content TEXT NOT NULL DEFAULT '', status TEXT NOT NULL DEFAULT 'active', updated_at REAL NOT NULL)"""
+
+
+def test_deleted_highest_id_is_not_reused(tmp_path):
+    store = SqliteNoteStore(SqliteDatabase(str(tmp_path / "n.db")))
+    store.add("a@x.com", "one", "")
+    last = store.add("a@x.com", "two", "")
+    store.delete("a@x.com", last["id"])
+    assert store.add("b@x.com", "three", "")["id"] > last["id"]
+
+
+def test_old_database_is_upgraded(tmp_path):
+    path = str(tmp_path / "old.db")
+    with sqlite3.connect(path) as db:
+        db.execute(OLD_NOTES_TABLE)
+        db.execute("INSERT INTO notes VALUES (1, 'a@x.com', 'kept', 'hello world', 'active', 1.0)")
+        db.execute("INSERT INTO notes VALUES (2, 'a@x.com', 'gone', '', 'active', 2.0)")
+        db.execute("DELETE FROM notes WHERE id = 2")
+
+    store = SqliteNoteStore(SqliteDatabase(path))
+    new = store.add("a@x.com", "new", "")
+    store.delete("a@x.com", new["id"])
+    assert store.add("a@x.com", "newer", "")["id"] == new["id"] + 1
+    assert [n["title"] for n in store.search("a@x.com", "hello")] == ["kept"]
+    with sqlite3.connect(path) as db:
+        assert "AUTOINCREMENT" in db.execute("SELECT sql FROM sqlite_master WHERE name = 'notes'").fetchone()[0]
+
+    # Opening it again leaves it alone
+    assert [n["title"] for n in SqliteNoteStore(SqliteDatabase(path)).all()] == ["kept", "newer"]
@@ -0,0 +1,115 @@
+import pytest
+
+from journal import NoteJournal
+from store import NoteConflict, NoteStore, UserStore
+from utils import load_json, save_json
+
+
+def open_store(tmp_path, **options):
+    return NoteStore(str(tmp_path / "notes.json"), load_json, save_json, **options)
+
+
+def test_updates_leave_load_json_cache_alone(tmp_path):
+    path = str(tmp_path / "notes.json")
+    save_json(path, {"notes": [{"id": 1, "owner": "a@x.com", "title": "t", "content": "c",
+                                "status": "active", "updated_at": 1.0}]})
+    cached = load_json(path)
+    store = open_store(tmp_path, journal=NoteJournal(str(tmp_path / "notes.journal")))
+    store.update("a@x.com", 1, title="changed")
+    assert cached["notes"][0]["title"] == "t"
+    assert load_json(path)["notes"][0]["title"] == "t"
+
+
+def test_returned_notes_are_copies(tmp_path):
+    store = open_store(tmp_path)
+    note = store.add("a@x.com", "t", "c")
+    note["title"] = "mutated"
+    store.get("a@x.com", note["id"])["title"] = "mutated"
+    store.list("a@x.com", "active")[0]["title"] = "mutated"
+    store.page("a@x.com", "active")[0][0]["title"] = "mutated"
+    assert store.get("a@x.com", note["id"])["title"] == "t"
+
+
+def test_failed_save_rolls_memory_back(tmp_path):
+    store = open_store(tmp_path)
+    note = store.add("a@x.com", "t", "c")
+
+    def failing_save(path, data):
+        raise OSError("disk full")
+
+    store._save = failing_save
+    with pytest.raises(OSError):
+        store.update("a@x.com", note["id"], title="lost")
+    with pytest.raises(OSError):
+        store.add("a@x.com", "also lost", "")
+    assert [n["title"] for n in store.all()] == ["t"]
+
+
+def test_update_conflict(tmp_path):
+    store = open_store(tmp_path)
+    note = store.add("a@x.com", "t", "c")
+    store.update("a@x.com", note["id"], title="other tab")
+    with pytest.raises(NoteConflict) as e:
+        store.update("a@x.com", note["id"], if_updated_at=note["updated_at"], title="stale")
+    assert e.value.note["title"] == "other tab"
+
+
+def test_keyset_pages_cover_every_note_once(tmp_path):
+    store = open_store(tmp_path)
+    ids = [n["id"] for n in store.add_many("a@x.com", [
+        {"title": str(i), "content": "", "status": "active", "updated_at": float(i % 3)}
+        for i in range(10)])]
+    seen, cursor = [], None
+    while True:
+        notes, cursor = store.page("a@x.com", "active", limit=3, before=cursor)
+        seen += [n["id"] for n in notes]
+        if cursor is None:
+            break
+    assert sorted(seen) == sorted(ids) and len(seen) == len(ids)
+
+
+def test_write_between_load_and_stat_is_not_lost(tmp_path):
+    path = str(tmp_path / "notes.json")
+    save_json(path, {"notes": [{"id": 1, "owner": "a@x.com", "title": "t", "content": "",
+                                "status": "active", "updated_at": 1.0}], "next_id": 2})
+    other_worker = [{"id": 1, "owner": "a@x.com", "title": "t", "content": "",
+                     "status": "active", "updated_at": 1.0},
+                    {"id": 2, "owner": "a@x.com", "title": "B's note", "content": "",
+                     "status": "active", "updated_at": 2.0}]
+
+    def load_then_race(p):
+        data = load_json(p)
+        if other_worker:
+            # another process replaces the file right after we parsed it
+            save_json(p, {"notes": other_worker[:], "next_id": 3})
+            other_worker.clear()
+        return data
+
+    store = NoteStore(path, load_then_race, save_json)
+    store.get("a@x.com", 1)
+    store.update("a@x.com", 1, title="A's edit")
+    assert sorted(n["title"] for n in load_json(path)["notes"]) == ["A's edit", "B's note"]
+
+
+def test_failed_user_save_changes_nothing(tmp_path):
+    users = UserStore(str(tmp_path / "users.json"), load_json, save_json)
+    users.add({"email": "a@x.com", "username": "a", "contact": "1"})
+
+    def failing_save(path, data):
+        raise OSError("disk full")
+
+    users._save = failing_save
+    with pytest.raises(OSError):
+        users.add({"email": "b@x.com", "username": "b", "contact": "2"})
+    with pytest.raises(OSError):
+        users.update("a@x.com", {"username": "renamed"})
+    assert users.find("b@x.com") is None
+    assert users.find_by("username", "renamed") is None
+    assert [u["username"] for u in users.all()] == ["a"]
+
+
+def test_load_json_keeps_no_second_copy(tmp_path):
+    # The stores hold their own parsed copies; load_json must not pin another
+    path = str(tmp_path / "notes.json")
+    save_json(path, {"notes": []})
+    assert load_json(path) is not load_json(path)
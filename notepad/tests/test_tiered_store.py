@@ -0,0 +1,59 @@
+import pytest
+
+from store import NoteConflict, NoteStore, TieredNoteStore
+from utils import load_json, save_json
+
+
+def open_store(tmp_path):
+    hot = NoteStore(str(tmp_path / "notes.json"), load_json, save_json)
+    cold = NoteStore(str(tmp_path / "notes-archive.json.gz"), load_json, save_json)
+    return TieredNoteStore(hot, cold)
+
+
+def tiers(tmp_path):
+    """Titles on disk in each tier."""
+    return [sorted(n["title"] for n in load_json(str(tmp_path / name)).get("notes", []))
+            for name in ("notes.json", "notes-archive.json.gz")]
+
+
+def test_first_start_splits_existing_notes(tmp_path):
+    save_json(str(tmp_path / "notes.json"), {"notes": [
+        {"id": 1, "owner": "a@x.com", "title": "active", "content": "", "status": "active", "updated_at": 1.0},
+        {"id": 2, "owner": "a@x.com", "title": "archived", "content": "", "status": "archived", "updated_at": 2.0},
+    ], "next_id": 5})
+    store = open_store(tmp_path)
+    assert tiers(tmp_path) == [["active"], ["archived"]]
+    assert store.add("a@x.com", "new", "")["id"] == 5
+
+
+def test_archive_and_restore_move_notes_between_tiers(tmp_path):
+    store = open_store(tmp_path)
+    ids = [store.add("a@x.com", title, "")["id"] for title in ("one", "two", "three")]
+    assert store.update_many("a@x.com", ids[:2], status="archived") == 2
+    assert tiers(tmp_path) == [["three"], ["one", "two"]]
+    assert sorted(n["title"] for n in store.list("a@x.com", "archived")) == ["one", "two"]
+    assert store.get("a@x.com", ids[0])["status"] == "archived"
+
+    assert store.update_many("a@x.com", [ids[0], ids[2]], status="active") == 2
+    assert tiers(tmp_path) == [["one", "three"], ["two"]]
+    assert sorted(n["title"] for n in store.all("a@x.com")) == ["one", "three", "two"]
+
+
+def test_add_many_puts_archived_notes_in_the_cold_tier(tmp_path):
+    store = open_store(tmp_path)
+    added = store.add_many("a@x.com", [
+        {"title": "kept", "content": "", "status": "active", "updated_at": 1.0},
+        {"title": "old", "content": "", "status": "archived", "updated_at": 2.0},
+    ])
+    assert len({n["id"] for n in added}) == 2
+    assert tiers(tmp_path) == [["kept"], ["old"]]
+    assert [n["title"] for n in store.list("a@x.com", "archived")] == ["old"]
+
+
+def test_stale_move_is_a_conflict(tmp_path):
+    store = open_store(tmp_path)
+    note = store.add("a@x.com", "t", "")
+    store.update("a@x.com", note["id"], title="edited elsewhere")
+    with pytest.raises(NoteConflict):
+        store.update("a@x.com", note["id"], if_updated_at=note["updated_at"], status="archived")
+    assert tiers(tmp_path) == [["edited elsewhere"], []]
@@ -0,0 +1,46 @@
+import pytest
+
+from mmap_store import MmapNoteStore
+from sqlite_store import SqliteDatabase, SqliteNoteStore
+from store import NoteStore
+from utils import load_json, save_json
+
+STORES = {
+    "json": lambda tmp_path: NoteStore(str(tmp_path / "notes.json"), load_json, save_json),
+    "mmap": lambda tmp_path: MmapNoteStore(str(tmp_path / "notes.mmap")),
+    "sqlite": lambda tmp_path: SqliteNoteStore(SqliteDatabase(str(tmp_path / "notepad.db"))),
+}
+
+
+@pytest.fixture(params=sorted(STORES))
+def open_store(request, tmp_path):
+    return lambda: STORES[request.param](tmp_path)
+
+
+def test_version_changes_with_every_kind_of_write(open_store):
+    store = open_store()
+    seen = [store.version("a@x.com")]
+    note = store.add("a@x.com", "t", "")
+    seen.append(store.version("a@x.com"))
+    store.update("a@x.com", note["id"], title="u")
+    seen.append(store.version("a@x.com"))
+    store.update_many("a@x.com", [note["id"]], status="archived")
+    seen.append(store.version("a@x.com"))
+    store.delete("a@x.com", note["id"])
+    seen.append(store.version("a@x.com"))
+    assert len(set(seen[1:])) == 4 and seen[0] not in seen[1:4]
+
+
+def test_version_is_per_owner_and_shared_by_processes(open_store):
+    store = open_store()
+    store.add("a@x.com", "t", "")
+    other = store.version("b@x.com")
+    store.add("a@x.com", "u", "")
+    assert store.version("b@x.com") == other
+    assert open_store().version("a@x.com") == store.version("a@x.com")
+
+
+def test_page_with_empty_limit_returns_nothing(open_store):
+    store = open_store()
+    store.add("a@x.com", "t", "")
+    assert store.page("a@x.com", "active", limit=0)[0] == []
@@ -0,0 +1,35 @@
+# ---------------- User lookup index ----------------
+
+class UserIndex:
+    """Hash maps from email, username and contact to the user dict.
+
+    Registration and profile validation check uniqueness with one dict
+    lookup each, and login finds the user by email the same way.
+    """
+
+    FIELDS = ("email", "username", "contact")
+
+    def __init__(self, users=()):
+        self.maps = {field: {} for field in self.FIELDS}
+        for user in users:
+            self.add(user)
+
+    def add(self, user):
+        for field in self.FIELDS:
+            value = user.get(field)
+            if value:
+                # First account wins if old data holds duplicates
+                self.maps[field].setdefault(value, user)
+
+    def remove(self, user):
+        for field in self.FIELDS:
+            if self.maps[field].get(user.get(field)) is user:
+                del self.maps[field][user[field]]
+
+    def copy(self):
+        index = UserIndex()
+        index.maps = {field: dict(users) for field, users in self.maps.items()}
+        return index
+
+    def get(self, field, value):
+        return self.maps[field].get(value)
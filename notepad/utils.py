@@ -1,10 +1,28 @@
-import json, os, time
-from werkzeug.security import generate_password_hash, check_password_hash
+import json, os, time, gzip
+from hashing import get_hashing_pool
 import random
+from store import NoteStore, ShardedNoteStore, TieredNoteStore, UserStore, STATUSES
+from sqlite_store import SqliteDatabase, SqliteNoteStore, SqliteUserStore
+from mmap_store import MmapNoteStore
+from journal import NoteJournal
+from flusher import Flusher
+from history import NoteHistory
+from profiling import TimedProxy, timed
+from locking import atomic_write
+from records import is_records_file, read_records, write_records
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))  # points to notepad/
 USERS_FILE = os.path.join(BASE_DIR, "data", "users.json")
 NOTES_FILE = os.path.join(BASE_DIR, "data", "notes.json")
+NOTES_JOURNAL_FILE = os.path.join(BASE_DIR, "data", "notes.journal")
+SQLITE_FILE = os.path.join(BASE_DIR, "data", "notepad.db")
+NOTES_SHARD_DIR = os.path.join(BASE_DIR, "data", "notes")
+NOTES_SEQUENCE_FILE = os.path.join(BASE_DIR, "data", "notes.seq")
+NOTES_ARCHIVE_FILE = os.path.join(BASE_DIR, "data", "notes-archive.json.gz")
+NOTES_MMAP_FILE = os.path.join(BASE_DIR, "data", "notes.mmap")
+NOTES_HISTORY_DIR = os.path.join(BASE_DIR, "data", "history")
+# Autosave keeps at most one revision per this many seconds
+AUTOSAVE_REVISION_INTERVAL = 300
 
 
 # ---------------- Generic helpers ----------------
@@ -14,126 +32,335 @@ def generate_otp():
     return "{:06d}".format(random.randint(0, 999999))
 
 
+# Not cached: every file is read by a store (store.py) that keeps its own
+# parsed copy and re-reads only when the file's stat signature changes.
 def load_json(path):
     if not os.path.exists(path):
         return []
-    with open(path, 'r') as f:
+    # Any file_format is readable whatever the current setting is
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, 'rb') as f:
         try:
-            return json.load(f)
-        except json.JSONDecodeError:
+            data = read_records(f) if is_records_file(f) else json.load(f)
+        except (json.JSONDecodeError, UnicodeDecodeError, gzip.BadGzipFile, EOFError):
             return []
+    return data
 
-def save_json(path, data):
-    with open(path, 'w') as f:
+def _write_gzip_json(f, data):
+    with gzip.GzipFile(fileobj=f, mode="wb") as gz:
+        gz.write(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+
+def write_json(f, data, file_format):
+    """Serialize data to text file f: "pretty" (indent=4) or "compact" (minified)."""
+    if file_format == "pretty":
         json.dump(data, f, indent=4)
+    elif file_format == "compact":
+        json.dump(data, f, separators=(",", ":"))
+    else:
+        raise ValueError(f"Unknown file format: {file_format!r}")
+
+def save_json(path, data, file_format=None):
+    # Write to a temp file and rename it into place so a crash never leaves a truncated file.
+    # A ".gz" path is written as compact, gzip-compressed JSON; other paths use
+    # file_format, by default the configured one (see configure_store).
+    file_format = file_format or _store_options["file_format"]
+    if path.endswith(".gz"):
+        return atomic_write(path, lambda f: _write_gzip_json(f, data), mode="wb")
+    if file_format == "records":
+        return atomic_write(path, lambda f: write_records(f, data), mode="wb")
+    return atomic_write(path, lambda f: write_json(f, data, file_format))
+
+# Hashing runs in the pool configured by create_app (see hashing.py)
+def hash_password(pw):
+    with timed("hash"):
+        return get_hashing_pool().hash(pw)
+
+def verify_password(pw, h):
+    with timed("hash"):
+        return get_hashing_pool().verify(pw, h)
+
+def needs_rehash(h): return get_hashing_pool().needs_rehash(h)
+
+# ---------------- Storage backend ----------------
+_store = None
+_user_store = None
+_flusher = None
+BACKENDS = ("json", "sharded", "mmap", "sqlite")
+FILE_FORMATS = ("pretty", "compact", "records")
+_store_options = {"backend": "json", "journal": False, "checkpoint_every": 1000,
+                  "cold_tier": False, "flush_interval": 0, "file_format": "pretty",
+                  "sqlite_path": SQLITE_FILE, "timed": False}
+
+def configure_store(**options):
+    """Set storage options (backend, journal, checkpoint_every, cold_tier, flush_interval,
+    file_format, sqlite_path, timed); takes effect on the next get_store()/get_user_store()."""
+    global _store, _user_store, _flusher
+    _check_store_options(dict(_store_options, **options))
+    if _flusher is not None:
+        _flusher.stop()
+        _flusher = None
+    _store_options.update(options)
+    _store = _user_store = None
+
+def _check_store_options(options):
+    """Raise ValueError for unknown values and combinations a backend would ignore."""
+    backend = options["backend"]
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown notes backend: {backend!r}")
+    if options["file_format"] not in FILE_FORMATS:
+        raise ValueError(f"Unknown file format: {options['file_format']!r}")
+    for option in ("journal", "cold_tier"):
+        if options[option] and backend != "json":
+            raise ValueError(f"{option} is only supported by the json backend, not {backend!r}")
+    if options["flush_interval"] > 0 and backend not in ("json", "sharded"):
+        # mmap and sqlite write every change in place; there is nothing to coalesce
+        raise ValueError(f"flush_interval is only supported by the json and sharded backends, "
+                         f"not {backend!r}")
+
+def store_options():
+    """A copy of the current storage options."""
+    return dict(_store_options)
+
+def _legacy_store():
+    """The json backend's store, with the journal and cold tier it ran with if their
+    files exist; a first start of the sharded or mmap backend imports its notes."""
+    journal = NoteJournal(NOTES_JOURNAL_FILE) if os.path.exists(NOTES_JOURNAL_FILE) else None
+    store = NoteStore(NOTES_FILE, load_json, save_json, journal=journal)
+    if os.path.exists(NOTES_ARCHIVE_FILE):
+        store = TieredNoteStore(store, NoteStore(NOTES_ARCHIVE_FILE, load_json, save_json))
+    return store
+
+def _open_stores():
+    global _store, _user_store, _flusher
+    # flush_interval > 0: write-behind, note saves are coalesced by a Flusher
+    write_behind = _store_options["flush_interval"] > 0
+    if _store_options["backend"] == "sqlite":
+        database = SqliteDatabase(_store_options["sqlite_path"])
+        _store = SqliteNoteStore(database)
+        _user_store = SqliteUserStore(database)
+    elif _store_options["backend"] == "json":
+        journal = NoteJournal(NOTES_JOURNAL_FILE) if _store_options["journal"] else None
+        _store = NoteStore(NOTES_FILE, load_json, save_json,
+                           journal=journal, checkpoint_every=_store_options["checkpoint_every"],
+                           write_behind=write_behind)
+        if _store_options["cold_tier"]:
+            _store = TieredNoteStore(_store, NoteStore(NOTES_ARCHIVE_FILE, load_json, save_json,
+                                                       write_behind=write_behind))
+        _user_store = UserStore(USERS_FILE, load_json, save_json)
+    elif _store_options["backend"] == "sharded":
+        _store = ShardedNoteStore(NOTES_SHARD_DIR, load_json, save_json,
+                                  sequence_path=NOTES_SEQUENCE_FILE, legacy=_legacy_store(),
+                                  write_behind=write_behind)
+        _user_store = UserStore(USERS_FILE, load_json, save_json)
+    elif _store_options["backend"] == "mmap":
+        _store = MmapNoteStore(NOTES_MMAP_FILE, legacy=_legacy_store())
+        _user_store = UserStore(USERS_FILE, load_json, save_json)
+    else:
+        raise ValueError(f"Unknown notes backend: {_store_options['backend']!r}")
+    if write_behind and hasattr(_store, "flush"):
+        _flusher = Flusher(_store.flush, _store_options["flush_interval"]).start()
+    if _store_options["timed"]:
+        # Request instrumentation: store calls show up in Server-Timing
+        stage = "db" if _store_options["backend"] == "sqlite" else "storage"
+        _store, _user_store = TimedProxy(_store, stage), TimedProxy(_user_store, stage)
+
+def get_store():
+    """Return the process-wide note store, creating it on first use."""
+    if _store is None:
+        _open_stores()
+    return _store
+
+def get_user_store():
+    """Return the process-wide user store, creating it on first use."""
+    if _user_store is None:
+        _open_stores()
+    return _user_store
+
+_history = None
+
+def get_history():
+    """Return the note revision history (history.py), shared by every backend."""
+    global _history
+    if _history is None:
+        _history = NoteHistory(NOTES_HISTORY_DIR)
+    return _history
 
-def hash_password(pw): return generate_password_hash(pw)
-def verify_password(pw, h): return check_password_hash(h, pw)
 
 # ---------------- Users ----------------
 def load_users():
-    try:
-        with open("data/users.json", "r") as f:
-            data = json.load(f)
-            if isinstance(data, list):
-                return data
-            elif isinstance(data, dict):
-                # Convert dict -> list if old format
-                return list(data.values())
-            else:
-                return []
-    except FileNotFoundError:
-        return []
+    return get_user_store().all()
+
+def find_user(email):
+    return get_user_store().find(email)
+
+def find_user_by_username(username):
+    return get_user_store().find_by("username", username)
 
+def find_user_by_contact(contact):
+    return get_user_store().find_by("contact", contact)
+
+def add_user(user):
+    get_user_store().add(user)
 
 def update_user_profile(email, updated_data):
-    users = load_json("data/users.json")
-    for i, user in enumerate(users):
-        if user["email"] == email:
-            users[i].update(updated_data)
-            break
-    save_json("data/users.json", users)
+    get_user_store().update(email, updated_data)
 
 
 # ---------------- Notes ----------------
-def load_notes():
-    data = load_json(NOTES_FILE)
-    return data.get("notes", [])
+def load_notes(owner=None):
+    """All notes, or only owner's (one shard read with the sharded backend)."""
+    return get_store().all(owner)
+
+def save_notes(notes, owner=None):
+    """Replace all notes, or only owner's when owner is given."""
+    get_store().replace_all(notes, owner)
 
-def save_notes(notes):
-    save_json(NOTES_FILE, {"notes": notes})
+def list_notes(owner, status):
+    """Return owner's notes with the given status, newest first."""
+    return get_store().page(owner, status)[0]
+
+def page_notes(owner, status, limit, cursor=None):
+    """One page of owner's notes, newest first, starting after `cursor`.
+    Returns (notes, cursor string for the next page or None)."""
+    notes, next_key = get_store().page(owner, status, limit, decode_cursor(cursor))
+    return notes, encode_cursor(next_key)
+
+def encode_cursor(key):
+    """(updated_at, id) -> "updated_at_id" for use in a URL."""
+    return None if key is None else f"{key[0]!r}_{key[1]}"
+
+def decode_cursor(cursor):
+    try:
+        updated_at, note_id = cursor.split("_")
+        return (float(updated_at), int(note_id))
+    except (AttributeError, ValueError):
+        return None
+
+def search_notes(owner, query, status=None):
+    """owner's notes containing every word of query (optionally one status), newest first."""
+    return sorted(get_store().search(owner, query, status), key=lambda x: x["updated_at"], reverse=True)
+
+def get_note(owner, note_id):
+    return get_store().get(owner, note_id)
+
+def notes_version(owner):
+    """Opaque string that changes whenever any of owner's notes changes."""
+    return get_store().version(owner)
+
+def note_etag(note):
+    """Strong ETag value for one note; updated_at moves on every change."""
+    return f"{note['id']}-{note['updated_at']!r}"
 
 def add_note(owner, title, content):
-    notes = load_notes()
-    note_id = max([n["id"] for n in notes], default=0) + 1
-    now = time.time()
-    notes.append({
-        "id": note_id,
-        "owner": owner,
-        "title": title,
-        "content": content,
-        "status": "active",
-        "updated_at": now
-    })
-    save_notes(notes)
+    return get_store().add(owner, title, content)
 
 def update_note(owner, note_id, title, content):
-    notes = load_notes()
-    for n in notes:
-        if n["id"]==note_id and n["owner"]==owner:
-            n["title"] = title
-            n["content"] = content
-            n["updated_at"] = time.time()
-            break
-    save_notes(notes)
+    """Update a note, keeping the version it replaces in its history."""
+    return _update_with_history(owner, note_id, {"title": title, "content": content})
+
+def patch_note(owner, note_id, fields, if_updated_at=None):
+    """Apply only the changed fields; raises store.NoteConflict if the note's
+    updated_at is no longer if_updated_at."""
+    return _update_with_history(owner, note_id, fields, if_updated_at,
+                                min_interval=AUTOSAVE_REVISION_INTERVAL)
+
+def _update_with_history(owner, note_id, fields, if_updated_at=None, min_interval=0):
+    before = get_store().get(owner, note_id)
+    before = dict(before) if before else None
+    note = get_store().update(owner, note_id, if_updated_at, **fields)
+    if note is not None and before is not None:
+        get_history().record(before, min_interval)
+    return note
+
+def note_revisions(owner, note_id):
+    """[(rev, saved_at)] of one of owner's notes, newest first."""
+    if get_note(owner, note_id) is None:
+        return []
+    return get_history().revisions(note_id)
+
+def note_revision(owner, note_id, rev):
+    if get_note(owner, note_id) is None:
+        return None
+    return get_history().get(note_id, rev)
 
 def soft_delete_note(owner, note_id):
-    notes = load_notes()
-    for n in notes:
-        if n["id"]==note_id and n["owner"]==owner:
-            n["status"] = "archived"
-            n["updated_at"] = time.time()
-            break
-    save_notes(notes)
+    return get_store().update(owner, note_id, status="archived")
 
 def restore_note(owner, note_id):
-    notes = load_notes()
-    for n in notes:
-        if n["id"]==note_id and n["owner"]==owner:
-            n["status"] = "active"
-            n["updated_at"] = time.time()
-            break
-    save_notes(notes)
+    get_store().update(owner, note_id, status="active")
 
 def permanently_delete_note(owner, note_id):
-    notes = load_notes()
-    notes = [n for n in notes if not (n["id"]==note_id and n["owner"]==owner)]
-    save_notes(notes)
+    if get_store().delete(owner, note_id):
+        get_history().delete([note_id])
+
+# Batch versions: one load and one save for any number of notes.
+# Each returns how many of owner's notes were changed.
+def soft_delete_notes(owner, note_ids):
+    return get_store().update_many(owner, note_ids, status="archived")
+
+def restore_notes(owner, note_ids):
+    return get_store().update_many(owner, note_ids, status="active")
+
+def permanently_delete_notes(owner, note_ids):
+    owned = [i for i in note_ids if get_store().get(owner, i) is not None]
+    count = get_store().delete_many(owner, owned)
+    get_history().delete(owned)
+    return count
+
+# ---------------- Export / import ----------------
+EXPORT_FIELDS = ("id", "title", "content", "status", "updated_at")
+
+def iter_notes(owner, batch_size=500):
+    """Yield all of owner's notes, active then archived, newest first, one page
+    from the store at a time."""
+    for status in STATUSES:
+        cursor = None
+        while True:
+            notes, cursor = get_store().page(owner, status, batch_size, cursor)
+            for n in notes:
+                yield {f: n[f] for f in EXPORT_FIELDS}
+            if cursor is None:
+                break
+
+def parse_note_line(line):
+    """One NDJSON line -> note fields for add_many, or None if it is not a valid note."""
+    try:
+        data = json.loads(line)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get("title"), str) or not data["title"].strip():
+        return None
+    content = data.get("content", "")
+    updated_at = data.get("updated_at")
+    return {
+        "title": data["title"].strip(),
+        "content": content if isinstance(content, str) else "",
+        "status": data.get("status") if data.get("status") in STATUSES else "active",
+        "updated_at": updated_at if isinstance(updated_at, (int, float)) else time.time(),
+    }
+
+def import_notes(owner, lines, batch_size=500):
+    """Add a note for each NDJSON line, batch_size notes per store write.
+    Imported notes get new ids. Returns (imported, skipped)."""
+    imported = skipped = 0
+    batch = []
+    for line in lines:
+        if not line.strip():
+            continue
+        note = parse_note_line(line)
+        if note is None:
+            skipped += 1
+            continue
+        batch.append(note)
+        if len(batch) >= batch_size:
+            imported += len(get_store().add_many(owner, batch))
+            batch = []
+    if batch:
+        imported += len(get_store().add_many(owner, batch))
+    return imported, skipped
 
 def update_note_owner(old_email, new_email):
     """Updates the 'owner' field for all notes associated with the old email.
        Applies strip/lower for robust matching against JSON data."""
-       
-    # Normalize emails for comparison against notes data
-    normalized_old_email = old_email.strip().lower()
-    normalized_new_email = new_email.strip().lower()
-    
-    notes = load_notes()
-    
-    # Flag to track if any changes were made
-    changes_made = False
-    
-    for note in notes:
-        # Normalize the note owner for comparison
-        note_owner_normalized = note["owner"].strip().lower()
-        
-        # Compare normalized emails
-        if note_owner_normalized == normalized_old_email:
-            # Update the stored owner to the new normalized email
-            # We save the new email in its *correct* case (from the form)
-            note["owner"] = new_email # Use the original case from the form/pending data
-            changes_made = True
-            
-    if changes_made:
-        save_notes(notes) 
-    return changes_made
\ No newline at end of file
+    # The stored owner keeps the new email in its original case (from the form)
+    return get_store().rename_owner(old_email, new_email)